@@ -0,0 +1,291 @@
+# Banc de mesures de nb_premier (sans affichage) : python -m bench <commande> …
+#   run [--quick] [--out FICHIER.json] [--only sieve,store,export,model,bound] [--repeat R]
+#       [--baseline BASE.json] [--tolerance T]
+#   compare BASE.json COURANT.json [--tolerance T]
+# Chaque mesure est la meilleure de R répétitions ; les résultats vont dans un JSON relu par
+# compare, qui signale les régressions au-delà de la tolérance (code de sortie 1).
+
+import sys
+import os
+import json
+import time
+import argparse
+import platform
+import tempfile
+import multiprocessing
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from engine import (
+    EXPORT_FORMATS,
+    STORE_FORMATS,
+    create_store,
+    export_store,
+    iter_primes,
+    nth_prime,
+    tuned_settings,
+    upper_bound_nth_prime,
+)
+
+BENCH_VERSION = 1
+SUITES = ("sieve", "store", "export", "model", "bound")
+
+# Tailles par défaut et en mode --quick
+_SIZES = {
+    False: dict(sieve_counts=(10**6, 10**7), seg_sizes=(1 << 16, 1 << 18, 1 << 19, 1 << 20, 1 << 21),
+                rows=10**7, bound_exps=range(3, 10), model_calls=200_000),
+    True: dict(sieve_counts=(10**6,), seg_sizes=(1 << 16, 1 << 18, 1 << 20),
+               rows=10**6, bound_exps=range(3, 8), model_calls=20_000),
+}
+
+
+# ---------- Mesures ----------
+def _best(fn, repeat: int) -> float:
+    """Meilleur temps (s) de repeat appels à fn : le bruit de la machine ne fait qu'allonger."""
+    best = float("inf")
+    for _ in range(max(1, repeat)):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def _result(name: str, value: float, unit: str, better: str = "higher", **extra) -> dict:
+    return dict(name=name, value=float(value), unit=unit, better=better, **extra)
+
+
+def bench_sieve(sizes: dict, repeat: int, work: Path, primes: np.ndarray):
+    # Débit du crible seul (premiers/s), par taille et par segment ; « tuned » : le réglage de
+    # tuned_settings, pour juger ses seuils face aux autres tailles
+    for n in sizes["sieve_counts"]:
+        tuned = tuned_settings(n)["segment_size"]
+        for seg in sorted(set(sizes["seg_sizes"]) | {tuned}):
+            def run():
+                for _ in iter_primes(count=n, seg_bytes=seg):
+                    pass
+            t = _best(run, repeat)
+            yield _result(f"sieve/n={n}/seg={seg}", n / t, "primes/s", seconds=t, tuned=seg == tuned)
+
+
+def bench_store(sizes: dict, repeat: int, work: Path, primes: np.ndarray):
+    # Écriture d'un magasin par format : Mo/s d'équivalent uint64 (8 octets par premier)
+    n = primes.size
+    for fmt, (suffix, _) in STORE_FORMATS.items():
+        path = work / f"write{suffix}"
+
+        def run():
+            mm = create_store(path, fmt, n)
+            for i in range(0, n, 1 << 20):
+                mm.append(primes[i:i + (1 << 20)])
+            mm.close()
+        t = _best(run, repeat)
+        yield _result(f"store/{fmt}", 8 * n / t / 1e6, "MB/s", seconds=t, file_bytes=path.stat().st_size)
+
+
+def bench_export(sizes: dict, repeat: int, work: Path, primes: np.ndarray):
+    # Export depuis un magasin uint64 : Mo/s du fichier produit
+    store = work / "source.dat"
+    if not store.exists():
+        mm = create_store(store, "uint64", primes.size)
+        mm.append(primes)
+        mm.close()
+    for fmt, (suffix, _) in EXPORT_FORMATS.items():
+        out = work / f"export_{fmt}{suffix}"
+        t = _best(lambda: export_store(store, primes.size, out, fmt), repeat)
+        size = out.stat().st_size
+        yield _result(f"export/{fmt}", size / t / 1e6, "MB/s", seconds=t, file_bytes=size)
+
+
+def bench_model(sizes: dict, repeat: int, work: Path, primes: np.ndarray):
+    # Latence de PrimeTableModel.data (µs par appel) : lignes au hasard (blocs froids) puis
+    # défilement ligne à ligne (blocs en cache). PySide6 est facultatif pour le reste du banc.
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    try:
+        from main import PrimeTableModel
+    except ImportError as e:
+        print(f"model : ignoré ({e})", file=sys.stderr)
+        return
+    store = work / "model.dat"
+    mm = create_store(store, "uint64", primes.size)
+    mm.append(primes)
+    mm.close()
+    calls = sizes["model_calls"]
+    window = min(primes.size, PrimeTableModel.WINDOW_ROWS)
+    cases = {
+        "random": np.random.default_rng(0).integers(0, window, calls).tolist(),
+        "scroll": [i % window for i in range(calls)],
+    }
+    for case, rows in cases.items():
+        def run():
+            model = PrimeTableModel(store, primes.size)
+            for r in rows:
+                model.data(model.index(r, 1))
+            model.release()
+        t = _best(run, repeat)
+        yield _result(f"model/data/{case}", 1e6 * t / calls, "us/call", better="lower", seconds=t)
+
+
+def bench_bound(sizes: dict, repeat: int, work: Path, primes: np.ndarray):
+    # Dépassement relatif de upper_bound_nth_prime(n) sur p_n exact (déterministe) et son coût
+    for e in sizes["bound_exps"]:
+        n = 10**e
+        p = nth_prime(n)
+        ub = upper_bound_nth_prime(n)
+        t = _best(lambda: upper_bound_nth_prime(n), repeat)
+        yield _result(f"bound/overshoot/n=10^{e}", (ub - p) / p, "ratio", better="lower",
+                      excess=ub - p, seconds=t)
+
+
+BENCHES = {
+    "sieve": bench_sieve,
+    "store": bench_store,
+    "export": bench_export,
+    "model": bench_model,
+    "bound": bench_bound,
+}
+
+
+# ---------- Rapport ----------
+def _machine() -> dict:
+    return dict(
+        python=platform.python_version(),
+        numpy=np.__version__,
+        platform=platform.platform(),
+        processor=platform.processor() or platform.machine(),
+        cpu_count=os.cpu_count(),
+    )
+
+
+def run_suite(suites, quick: bool = False, repeat: int = 3, tmp_dir: Path = None, on_result=None) -> dict:
+    """Exécute les suites demandées et renvoie le rapport (dict sérialisable en JSON)."""
+    sizes = _SIZES[quick]
+    results = []
+    with tempfile.TemporaryDirectory(prefix="nb_premier_bench_", dir=tmp_dir) as tmp:
+        work = Path(tmp)
+        primes = None
+        for suite in suites:
+            if primes is None and suite in ("store", "export", "model"):
+                primes = np.concatenate(list(iter_primes(count=sizes["rows"])))
+            for res in BENCHES[suite](sizes, repeat, work, primes):
+                results.append(res)
+                if on_result:
+                    on_result(res)
+    return dict(
+        version=BENCH_VERSION,
+        created=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        machine=_machine(),
+        params=dict(quick=quick, repeat=repeat, suites=list(suites), rows=sizes["rows"]),
+        results=results,
+    )
+
+
+def compare_reports(base: dict, current: dict, tolerance: float = 0.10) -> list:
+    """Lignes (nom, base, courant, écart relatif, régression) des mesures communes. L'écart est
+    orienté : négatif = moins bien, quel que soit le sens de l'unité."""
+    base_by_name = {r["name"]: r for r in base["results"]}
+    rows = []
+    for r in current["results"]:
+        b = base_by_name.get(r["name"])
+        if b is None or not b["value"]:
+            continue
+        change = (r["value"] - b["value"]) / abs(b["value"])
+        if r.get("better", "higher") == "lower":
+            change = -change
+        rows.append((r["name"], b["value"], r["value"], change, change < -tolerance))
+    return rows
+
+
+def _format_value(value: float, unit: str) -> str:
+    if unit == "ratio":
+        return f"{value:.3e}"
+    if unit == "primes/s":
+        return f"{value / 1e6:,.1f} M/s".replace(",", " ")
+    return f"{value:,.2f} {unit}".replace(",", " ")
+
+
+def _print_comparison(base: dict, current: dict, tolerance: float) -> int:
+    units = {r["name"]: r["unit"] for r in current["results"]}
+    rows = compare_reports(base, current, tolerance)
+    width = max((len(name) for name, *_ in rows), default=10)
+    for name, b, c, change, regressed in rows:
+        flag = "RÉGRESSION" if regressed else ""
+        print(f"{name:<{width}}  {_format_value(b, units[name]):>16}  {_format_value(c, units[name]):>16}"
+              f"  {100 * change:+7.1f} %  {flag}")
+    regressions = sum(1 for *_, regressed in rows if regressed)
+    if base.get("machine") != current.get("machine"):
+        print("Attention : rapports issus de machines ou d'environnements différents.", file=sys.stderr)
+    print(f"{len(rows)} mesures comparées, {regressions} régression(s) au-delà de {100 * tolerance:.0f} %.",
+          file=sys.stderr)
+    return 1 if regressions else 0
+
+
+def _read_report(path) -> dict:
+    with open(path, "r", encoding="utf-8") as f:
+        report = json.load(f)
+    if report.get("version") != BENCH_VERSION:
+        raise ValueError(f"Version de rapport non prise en charge : {path}")
+    return report
+
+
+# ---------- Commandes ----------
+def cmd_run(args) -> int:
+    suites = SUITES if not args.only else tuple(s.strip() for s in args.only.split(",") if s.strip())
+    unknown = [s for s in suites if s not in BENCHES]
+    if unknown:
+        print(f"Suite inconnue : {', '.join(unknown)} (choix : {', '.join(SUITES)})", file=sys.stderr)
+        return 2
+    baseline = _read_report(args.baseline) if args.baseline else None
+
+    def show(res):
+        print(f"{res['name']:<32} {_format_value(res['value'], res['unit'])}", file=sys.stderr, flush=True)
+
+    report = run_suite(suites, args.quick, args.repeat, Path(args.tmp) if args.tmp else None, show)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"rapport  {args.out}", file=sys.stderr)
+    if baseline is not None:
+        return _print_comparison(baseline, report, args.tolerance)
+    return 0
+
+
+def cmd_compare(args) -> int:
+    try:
+        base, current = _read_report(args.base), _read_report(args.current)
+    except (OSError, ValueError) as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return 2
+    return _print_comparison(base, current, args.tolerance)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m bench", description="banc de mesures de nb_premier")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("run", help="exécute les mesures et écrit le rapport JSON")
+    p.add_argument("--quick", "-q", action="store_true", help="tailles réduites (contrôle rapide)")
+    p.add_argument("--only", help=f"suites séparées par des virgules ({','.join(SUITES)})")
+    p.add_argument("--repeat", "-R", type=int, default=3, help="répétitions par mesure (meilleur temps gardé)")
+    p.add_argument("--out", "-o", default="bench.json", help="rapport JSON")
+    p.add_argument("--tmp", help="dossier des fichiers de travail (défaut : dossier temporaire)")
+    p.add_argument("--baseline", "-b", help="rapport de référence à comparer aussitôt")
+    p.add_argument("--tolerance", "-t", type=float, default=0.10, help="régression signalée au-delà (0.10 = 10 %%)")
+    p.set_defaults(func=cmd_run)
+
+    p = sub.add_parser("compare", help="compare deux rapports et signale les régressions")
+    p.add_argument("base")
+    p.add_argument("current")
+    p.add_argument("--tolerance", "-t", type=float, default=0.10, help="régression signalée au-delà (0.10 = 10 %%)")
+    p.set_defaults(func=cmd_compare)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,352 @@
+# Ligne de commande de nb_premier (sans Qt) : python -m cli <commande> …
+#   generate --count N | --range A B  [--out FICHIER] [--format uint64|gaps|bits] [--workers W]
+#            [--stats gaps,records,residues,twins,pyramid|all] [--profile] [--trace TRACE.json]
+#   stream --count N | --range A B  [--binary] [--workers W]   (premiers sur stdout, sans magasin)
+#   export MAGASIN SORTIE [--format txt|u32|u64|npy|zlib|lzma|bz2] [--rows I J | --values A B]
+#          [--profile] [--trace TRACE.json]
+#   nth N [--window K]
+#   pi X
+#   isprime V [V …] [--store MAGASIN]
+#   tune [--force]   (calibrage de segment_size pour cet hôte, repris par generate et stream)
+
+import sys
+import os
+import signal
+import argparse
+import multiprocessing
+from pathlib import Path
+
+import numpy as np
+
+from engine import (
+    GenConfig,
+    GenerationError,
+    PrimeGenerator,
+    Profiler,
+    EXPORT_FORMATS,
+    STATS,
+    STORE_FORMATS,
+    auto_tune,
+    cache_topology,
+    export_format_for,
+    export_store,
+    is_prime,
+    iter_primes,
+    nth_prime_window,
+    open_store,
+    parse_int_expr,
+    prime_pi,
+    read_store_meta,
+    riemann_r,
+    tuned_settings,
+    tuning_path,
+)
+
+
+# ---------- Utilitaires ----------
+def _int_arg(text: str) -> int:
+    try:
+        return parse_int_expr(text)
+    except (ValueError, ArithmeticError):
+        raise argparse.ArgumentTypeError(f"entier attendu : {text!r}")
+
+
+def _stats_arg(text: str) -> tuple:
+    names = tuple(STATS) if text.strip() == "all" else tuple(s.strip() for s in text.split(",") if s.strip())
+    unknown = [s for s in names if s not in STATS]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"statistique inconnue : {', '.join(unknown)} (choix : {', '.join(STATS)})")
+    return names
+
+
+class _Console:
+    """Progression sur stderr (une ligne réécrite) ; stdout reste réservé aux résultats."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self._open = False
+
+    def progress(self, done, total):
+        pct = min(100.0, 100.0 * done / max(1, total))
+        line = f"{self.label} : {done:,} / {total:,} ({pct:5.1f} %)".replace(",", " ")
+        print(f"\r{line}", end="", file=sys.stderr, flush=True)
+        self._open = True
+
+    def status(self, message: str):
+        self.end()
+        print(message, file=sys.stderr, flush=True)
+
+    def end(self):
+        if self._open:
+            print(file=sys.stderr, flush=True)
+            self._open = False
+
+
+def _print_stats(stats: dict):
+    first, rows = stats["rows"]
+    if first:
+        print(f"stats    lignes {first} à {rows - 1} (magasin prolongé sans état enregistré)")
+    if "twins" in stats:
+        print(f"jumeaux  {stats['twins']}")
+    if stats.get("records"):
+        gap, p, row = stats["records"][-1]
+        print(f"record   écart {gap} après {p} (ligne {row})")
+    if stats.get("gaps"):
+        top = sorted(stats["gaps"].items(), key=lambda kv: -kv[1])[:6]
+        print("écarts   " + " ".join(f"{g}:{c}" for g, c in top))
+    if "residues" in stats:
+        k, counts = stats["residues"]["modulus"], stats["residues"]["counts"]
+        print(f"mod {k:<4} " + " ".join(f"{r}:{c}" for r, c in enumerate(counts) if c))
+
+
+def _report_profile(profiler, args):
+    # Temps par phase sur stderr (--profile) ; la trace est écrite par l'appelant
+    if args.profile:
+        print(profiler.summary(), file=sys.stderr)
+    if args.trace:
+        print(f"trace    {args.trace}", file=sys.stderr)
+
+
+def _format_from_suffix(path: Path):
+    for fmt, (suffix, _) in STORE_FORMATS.items():
+        if path.suffix == suffix:
+            return fmt
+    return None
+
+
+# ---------- Commandes ----------
+def cmd_generate(args) -> int:
+    prime_range = None
+    if args.range is not None:
+        a, b = args.range
+        if not 0 <= a <= b < 1 << 64:
+            print("Intervalle invalide : 0 <= a <= b < 2^64 requis.", file=sys.stderr)
+            return 2
+        prime_range = (a, b)
+        total = max(1, int(riemann_r(b) - riemann_r(max(a - 1, 0))))
+    else:
+        total = args.count
+
+    settings = tuned_settings(total)
+    out = Path(args.out)
+    fmt = args.format or _format_from_suffix(out) or settings["store_format"]
+    suffix = STORE_FORMATS[fmt][0]
+    if out.suffix != suffix:
+        out = out.with_suffix(suffix)
+    settings["store_format"] = fmt
+    if args.workers is not None:
+        settings["workers"] = max(1, args.workers)
+    if args.segment_size is not None:
+        settings["segment_size"] = max(1, args.segment_size)
+
+    extend = False
+    if args.resume:
+        meta = read_store_meta(out) if out.exists() else None
+        extend = meta is not None and meta["format"] == fmt and meta["range"] == prime_range
+        if not extend:
+            print(f"Aucun magasin compatible à reprendre : {out} (nouvelle génération)", file=sys.stderr)
+
+    cfg = GenConfig(
+        count=total,
+        extend=extend,
+        prime_range=prime_range,
+        tmp_dir=out.parent,
+        mmap_filename=out.name,
+        trace_file=args.trace,
+        stats=args.stats if args.stats is not None else GenConfig.stats,
+        **settings
+    )
+    console = _Console("Premiers")
+    gen = PrimeGenerator(cfg, on_progress=console.progress, on_status=console.status)
+    # Ctrl-C : arrêt propre (magasin et métadonnées cohérents, reprise possible avec --resume)
+    signal.signal(signal.SIGINT, lambda *_: gen.stop())
+    try:
+        found, pmax, total_sum, avg, stats = gen.run()
+    except GenerationError as e:
+        console.status(f"Erreur : {e}")
+        return 1
+    finally:
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+        console.end()
+        _report_profile(gen.profile, args)
+    print(f"magasin  {out}")
+    print(f"nombre   {found}")
+    print(f"pmax     {pmax}")
+    print(f"somme    {total_sum}")
+    print(f"moyenne  {avg:.6f}")
+    _print_stats(stats)
+    return 0
+
+
+def cmd_stream(args) -> int:
+    # Premiers écrits sur stdout au fil du crible : texte (un par ligne) ou uint64 little-endian
+    if args.range is not None:
+        start, stop, count = args.range[0], args.range[1], None
+    else:
+        start, stop, count = 0, None, args.count
+    workers = 1 if args.workers is None else max(1, args.workers)
+    seg_bytes = tuned_settings(count or 1)["segment_size"] if args.segment_size is None else args.segment_size
+    out = sys.stdout.buffer
+    stream = iter_primes(start, stop, count, seg_bytes, workers)
+    try:
+        for primes in stream:
+            if args.binary:
+                out.write(primes.astype("<u8", copy=False).tobytes())
+            else:
+                out.write(("\n".join(map(str, primes.tolist())) + "\n").encode("ascii"))
+        out.flush()
+    except BrokenPipeError:
+        # Lecteur fermé (| head…) : arrêt silencieux, stdout redirigé pour la sortie de l'interpréteur
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except ValueError as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return 2
+    finally:
+        stream.close()
+    return 0
+
+
+def cmd_export(args) -> int:
+    store = Path(args.store)
+    try:
+        meta = read_store_meta(store)
+        count = meta["count"] if meta is not None else len(open_store(store))
+    except (OSError, ValueError) as e:
+        print(f"Erreur : magasin illisible ({e})", file=sys.stderr)
+        return 2
+    console = _Console("Export")
+    fmt = args.format or export_format_for(args.out)
+    profiler = Profiler(trace=args.trace is not None)
+    try:
+        done = export_store(store, count, args.out, fmt, on_progress=console.progress, workers=args.workers,
+                            rows=args.rows, values=args.values, profiler=profiler)
+    except (OSError, ValueError) as e:
+        console.status(f"Erreur : {e}")
+        return 1
+    finally:
+        console.end()
+        if args.trace:
+            profiler.write_trace(args.trace)
+        _report_profile(profiler, args)
+    return 0 if done else 1
+
+
+def cmd_nth(args) -> int:
+    if args.n < 1 or args.window < 0:
+        print("n >= 1 et K >= 0 requis.", file=sys.stderr)
+        return 2
+    for p in nth_prime_window(args.n, args.window).tolist():
+        print(p)
+    return 0
+
+
+def cmd_pi(args) -> int:
+    print(prime_pi(args.x))
+    return 0
+
+
+def cmd_isprime(args) -> int:
+    bad = [v for v in args.values if not 0 <= v < 1 << 64]
+    if bad:
+        print(f"Valeurs hors de [0, 2^64) : {', '.join(map(str, bad))}", file=sys.stderr)
+        return 2
+    values = np.array(args.values, dtype=np.uint64)
+    try:
+        flags = is_prime(values, store_path=Path(args.store) if args.store else None)
+    except (OSError, ValueError, ArithmeticError) as e:
+        print(f"Erreur : {e}", file=sys.stderr)
+        return 2
+    for v, f in zip(args.values, flags.tolist()):
+        print(v, int(f))
+    return 0
+
+
+def cmd_tune(args) -> int:
+    caches = cache_topology()
+    print("caches   " + (" ".join(f"L{lvl}:{size >> 10} Kio" for lvl, size in sorted(caches.items()))
+                         or "inconnus"))
+    console = _Console("Calibrage")
+    tuning = auto_tune(force=args.force, on_progress=console.progress)
+    console.end()
+    for seg, ns in sorted(tuning["ns_per_byte"].items(), key=lambda kv: int(kv[0])):
+        mark = "  <-" if int(seg) == tuning["segment_size"] else ""
+        print(f"segment  {int(seg) >> 10:>6} Kio  {ns:8.1f} ns/octet{mark}")
+    print(f"réglage  {tuning_path()} ({tuning['host']}, {tuning['created']})")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m cli", description="nb_premier en ligne de commande (sans Qt)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("generate", help="génère N premiers ou ceux d'un intervalle dans un magasin")
+    what = p.add_mutually_exclusive_group(required=True)
+    what.add_argument("--count", "-n", type=_int_arg, help="nombre de premiers (10^9, 1e9, …)")
+    what.add_argument("--range", "-r", type=_int_arg, nargs=2, metavar=("A", "B"), help="tous les premiers de [A, B]")
+    p.add_argument("--out", "-o", default="primes.dat", help="magasin de sortie (.dat, .gaps ou .bits)")
+    p.add_argument("--format", "-f", choices=list(STORE_FORMATS), help="format du magasin (défaut : extension, sinon selon N)")
+    p.add_argument("--workers", "-w", type=int, help="processus de crible (défaut : selon N)")
+    p.add_argument("--segment-size", type=_int_arg, help="octets de bitmap par segment")
+    p.add_argument("--resume", action="store_true", help="prolonge ou reprend le magasin existant")
+    p.add_argument("--stats", type=_stats_arg, metavar="LISTE",
+                   help=f"statistiques au fil du crible, séparées par des virgules, ou all "
+                        f"(défaut : {','.join(GenConfig.stats)})")
+    p.add_argument("--profile", action="store_true", help="temps par phase et compteurs sur stderr")
+    p.add_argument("--trace", help="trace Chrome (JSON) des phases, pour chrome://tracing ou Perfetto")
+    p.set_defaults(func=cmd_generate)
+
+    p = sub.add_parser("stream", help="écrit les premiers sur stdout au fil du crible, sans magasin")
+    what = p.add_mutually_exclusive_group(required=True)
+    what.add_argument("--count", "-n", type=_int_arg, help="nombre de premiers")
+    what.add_argument("--range", "-r", type=_int_arg, nargs=2, metavar=("A", "B"), help="tous les premiers de [A, B]")
+    p.add_argument("--binary", "-b", action="store_true", help="uint64 little-endian au lieu du texte")
+    p.add_argument("--workers", "-w", type=int, help="processus de crible (défaut : 1)")
+    p.add_argument("--segment-size", type=_int_arg, help="octets de bitmap par segment")
+    p.set_defaults(func=cmd_stream)
+
+    p = sub.add_parser("export", help="exporte un magasin (texte, binaire, .npy ou écarts compressés)")
+    p.add_argument("store")
+    p.add_argument("out")
+    p.add_argument("--format", "-f", choices=list(EXPORT_FORMATS),
+                   help="format d'export (défaut : extension de OUT, .pdz = zlib, sinon texte)")
+    part = p.add_mutually_exclusive_group()
+    part.add_argument("--rows", type=_int_arg, nargs=2, metavar=("I", "J"),
+                      help="lignes I (incluse) à J (exclue), comptées à partir de 0")
+    part.add_argument("--values", type=_int_arg, nargs=2, metavar=("A", "B"),
+                      help="premiers compris entre A et B inclus")
+    p.add_argument("--workers", "-w", type=int, help="threads de formatage (défaut : nombre de cœurs)")
+    p.add_argument("--profile", action="store_true", help="temps par phase et compteurs sur stderr")
+    p.add_argument("--trace", help="trace Chrome (JSON) des phases, pour chrome://tracing ou Perfetto")
+    p.set_defaults(func=cmd_export)
+
+    p = sub.add_parser("nth", help="n-ième premier, sans magasin")
+    p.add_argument("n", type=_int_arg)
+    p.add_argument("--window", "-k", type=_int_arg, default=0, help="affiche aussi les K premiers suivants")
+    p.set_defaults(func=cmd_nth)
+
+    p = sub.add_parser("pi", help="π(x) exact")
+    p.add_argument("x", type=_int_arg)
+    p.set_defaults(func=cmd_pi)
+
+    p = sub.add_parser("isprime", help="test de primalité")
+    p.add_argument("values", type=_int_arg, nargs="+")
+    p.add_argument("--store", help="magasin consulté pour les valeurs qu'il couvre")
+    p.set_defaults(func=cmd_isprime)
+
+    p = sub.add_parser("tune", help="calibre segment_size pour cet hôte (caches, crible court)")
+    p.add_argument("--force", action="store_true", help="recalibre même si un réglage est enregistré")
+    p.set_defaults(func=cmd_tune)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    if getattr(args, "count", None) is not None and args.count < 1:
+        print("Le nombre demandé doit être > 0.", file=sys.stderr)
+        return 2
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,2807 @@
+# Moteur de nb_premier, sans dépendance à Qt : crible, magasins, requêtes, génération et export.
+# Utilisé par l'interface (main.py) et par la ligne de commande (cli.py).
+
+import sys
+import os
+import math
+import time
+import tempfile
+import gc
+import shutil
+import json
+import platform
+import multiprocessing
+import zlib
+import lzma
+import bz2
+import threading
+import signal
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from dataclasses import dataclass
+from decimal import Decimal
+
+import numpy as np
+
+
+# ---------- Bornes supérieures (exactes) ----------
+def _zeta(s: int) -> float:
+    # ζ(s), s >= 2 : 50 termes + correction d'Euler–Maclaurin (précision ~1e-15)
+    n = 50
+    head = math.fsum(k ** -s for k in range(1, n))
+    return head + n ** (1 - s) / (s - 1) + 0.5 * n ** -s + s * n ** (-s - 1) / 12
+
+
+_ZETA = [0.0, 0.0] + [_zeta(s) for s in range(2, 160)]
+
+
+def riemann_r(x: float) -> float:
+    """Fonction R de Riemann (série de Gram) : approximation de π(x) à ~√x près."""
+    if x < 2:
+        return 0.0
+    ln_x = math.log(x)
+    total, term = 1.0, 1.0
+    for k in range(1, len(_ZETA) - 1):
+        term *= ln_x / k
+        part = term / (k * _ZETA[k + 1])
+        total += part
+        if part < 1e-12 * total:
+            break
+    return total
+
+
+def li(x) -> np.ndarray:
+    """Logarithme intégral li(x), x > 1, vectorisé en float64 (série de Ramanujan)."""
+    x = np.asarray(x, dtype=np.float64)
+    ln_x = np.log(x)
+    total = np.zeros_like(x)
+    term = np.full_like(x, -1.0)
+    inner = 0.0
+    for n in range(1, 200):
+        term *= -ln_x / (n * (2.0 if n > 1 else 1.0))
+        if n % 2:
+            inner += 1.0 / n
+        total += term * inner
+        if np.all(np.abs(term * inner) < 1e-17 * np.abs(total)):
+            break
+    return 0.5772156649015329 + np.log(ln_x) + np.sqrt(x) * total
+
+
+def inverse_riemann_r(n: float) -> float:
+    """x tel que R(x) = n (Newton, R'(x) ≈ 1 / ln x) : estimation de p_n."""
+    if n < 2:
+        return 2.0
+    x = n * math.log(n)
+    for _ in range(100):
+        step = (riemann_r(x) - n) * math.log(x)
+        x = max(x - step, 2.0)
+        if abs(step) < 0.5:
+            break
+    return x
+
+
+def upper_bound_nth_prime(n: int) -> int:
+    """Borne certifiée p_n <= ub, à ~√p_n près : estimation R⁻¹(n) puis contrôle par π(ub)."""
+    if n < 6:
+        return 15
+    x = inverse_riemann_r(n)
+    ub = int(x + 2 * math.sqrt(x)) + 64
+    while True:
+        missing = n - prime_pi(ub)
+        if missing <= 0:
+            return ub
+        ub += int(missing * math.log(ub) + math.sqrt(ub))
+
+
+# ---------- Config ----------
+@dataclass
+class GenConfig:
+    count: int
+    segment_size: int = 1 << 20       # octets de bitmap par segment (30 entiers par octet)
+    tmp_dir: Path = Path(tempfile.gettempdir())
+    mmap_filename: str = "primes_memmap.dat"
+    update_interval_ms: int = 75
+    workers: int = 1
+    store_format: str = "uint64"      # "uint64" (.dat), "gaps" (.gaps) ou "bits" (.bits)
+    extend: bool = False              # prolonger / reprendre le magasin existant au lieu de le recréer
+    checkpoint_interval_s: float = 30.0  # période des points de reprise pendant le crible
+    prime_range: tuple = None         # (a, b) : tous les premiers de [a, b] (b < 2^64) au lieu de count
+    stats: tuple = ("gaps", "records", "twins")  # calculées au fil du crible (STATS) ; "residues" et
+                                                 # "pyramid", les plus coûteuses, sur demande
+    residue_modulus: int = 30         # k des comptes de résidus mod k
+    profile: bool = True              # temps par phase et compteurs (Profiler), coût négligeable
+    trace_file: str = None            # chemin d'une trace Chrome (chrome://tracing, Perfetto) écrite en fin de run
+
+
+# ---------- Profilage ----------
+# Temps mur et CPU (du thread) cumulés par phase, et compteurs. Une phase est un bloc
+# « with profiler.phase(nom) » autour d'un segment ou d'un bloc entier, jamais d'un élément :
+# deux lectures d'horloge par bloc, d'où un profilage laissé actif en production. Avec
+# trace=True, chaque intervalle est aussi gardé (au plus max_events) pour write_trace().
+class _Phase:
+    __slots__ = ("prof", "name", "wall", "cpu")
+
+    def __init__(self, prof, name: str):
+        self.prof, self.name = prof, name
+
+    def __enter__(self):
+        self.wall, self.cpu = time.perf_counter_ns(), time.thread_time_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.prof.record(self.name, self.wall, time.perf_counter_ns() - self.wall,
+                         time.thread_time_ns() - self.cpu)
+        return False
+
+
+class _NoPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NO_PHASE = _NoPhase()
+
+
+class Profiler:
+    """Temps par phase (appels, mur, CPU) et compteurs, sûrs entre threads. report() en dict,
+    summary() en texte, write_trace() en trace Chrome (événements « X », un pid par processus,
+    un tid par thread : les workers du crible apparaissent sur leur propre ligne)."""
+
+    def __init__(self, enabled: bool = True, trace: bool = False, max_events: int = 1 << 18):
+        self.enabled = enabled
+        self.t0 = time.perf_counter_ns()
+        self.phases = {}      # nom -> [appels, mur ns, CPU ns]
+        self.counters = {}
+        self.events = [] if enabled and trace else None
+        self.max_events = max_events
+        self._lock = threading.Lock()
+
+    def phase(self, name: str):
+        return _Phase(self, name) if self.enabled else _NO_PHASE
+
+    def record(self, name: str, start_ns: int, wall_ns: int, cpu_ns: int, pid: int = None, tid: int = None):
+        with self._lock:
+            acc = self.phases.get(name)
+            if acc is None:
+                acc = self.phases[name] = [0, 0, 0]
+            acc[0] += 1
+            acc[1] += wall_ns
+            acc[2] += cpu_ns
+            if self.events is not None:
+                if len(self.events) < self.max_events:
+                    self.events.append((name, start_ns, wall_ns, cpu_ns, pid or os.getpid(),
+                                        tid or threading.get_native_id()))
+                else:
+                    self.counters["dropped_events"] = self.counters.get("dropped_events", 0) + 1
+
+    def count(self, name: str, n: int = 1):
+        if self.enabled:
+            with self._lock:
+                self.counters[name] = self.counters.get(name, 0) + int(n)
+
+    def merge(self, events, counters: dict, prefix: str = ""):
+        """Ajoute les intervalles et compteurs d'un autre Profiler (p. ex. d'un worker)."""
+        for name, start, wall, cpu, pid, tid in events or ():
+            self.record(prefix + name, start, wall, cpu, pid, tid)
+        for name, n in counters.items():
+            self.count(name, n)
+
+    def timed(self, iterable, name: str):
+        """Itère sur iterable en comptant l'attente de chaque élément dans la phase name."""
+        it = iter(iterable)
+        while True:
+            with self.phase(name):
+                try:
+                    item = next(it)
+                except StopIteration:
+                    return
+            yield item
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "wall": (time.perf_counter_ns() - self.t0) / 1e9,
+                "phases": {name: {"calls": c, "wall": w / 1e9, "cpu": u / 1e9}
+                           for name, (c, w, u) in self.phases.items()},
+                "counters": dict(self.counters),
+            }
+
+    def summary(self) -> str:
+        """Tableau texte : phases par temps mur décroissant, puis compteurs."""
+        rep = self.report()
+        total = rep["wall"] or 1.0
+        lines = [f"{'phase':<18} {'appels':>8} {'mur (s)':>9} {'CPU (s)':>9} {'% mur':>6}"]
+        for name, ph in sorted(rep["phases"].items(), key=lambda kv: -kv[1]["wall"]):
+            lines.append(f"{name:<18} {ph['calls']:>8} {ph['wall']:>9.3f} {ph['cpu']:>9.3f} "
+                         f"{100 * ph['wall'] / total:>6.1f}")
+        lines.append(f"{'total':<18} {'':>8} {total:>9.3f}")
+        lines += [f"{name:<18} {n:>8}" for name, n in sorted(rep["counters"].items())]
+        return "\n".join(lines)
+
+    def write_trace(self, path):
+        """Trace Chrome (JSON) : un événement complet par intervalle, ts et dur en µs."""
+        with self._lock:
+            events = list(self.events or ())
+        pids = sorted({e[4] for e in events} | {os.getpid()})
+        trace = [{"name": "process_name", "ph": "M", "pid": pid,
+                  "args": {"name": "nb_premier" if pid == os.getpid() else f"crible {pid}"}} for pid in pids]
+        for name, start, wall, cpu, pid, tid in events:
+            trace.append({"name": name, "cat": name.split("/")[0], "ph": "X", "pid": pid, "tid": tid,
+                          "ts": (start - self.t0) / 1e3, "dur": wall / 1e3, "args": {"cpu_ms": cpu / 1e6}})
+        rep = self.report()
+        trace.append({"name": "compteurs", "ph": "C", "pid": os.getpid(), "ts": rep["wall"] * 1e6,
+                      "args": rep["counters"]})
+        tmp = Path(str(path) + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"traceEvents": trace, "displayTimeUnit": "ms", "otherData": rep}, f)
+        os.replace(tmp, path)
+
+
+_NO_PROFILE = Profiler(enabled=False)
+
+
+# ---------- Crible segmenté (roue mod 30) ----------
+# Un octet couvre les 30 entiers [30k, 30k + 30) : ses 8 bits sont les résidus premiers
+# avec 30 (bit j <-> 30k + WHEEL_RESIDUES[j]). Les multiples de 2, 3 et 5 n'existent pas.
+WHEEL = 30
+WHEEL_RESIDUES = np.array([1, 7, 11, 13, 17, 19, 23, 29], dtype=np.int64)
+_WHEEL_RESIDUES_U64 = WHEEL_RESIDUES.astype(np.uint64)
+_WHEEL_BITIDX = np.zeros(WHEEL, dtype=np.uint8)
+_WHEEL_BITIDX[WHEEL_RESIDUES] = np.arange(8, dtype=np.uint8)
+
+# Premiers >= segment / BUCKET_HITS : au plus BUCKET_HITS passages par segment et par
+# résidu. Ils sont rangés dans des seaux (crible à seaux d'Oliveira e Silva) plutôt que
+# d'être visités un par un avec une tranche numpy à chaque segment.
+BUCKET_HITS = 64
+
+
+def wheel_seed(primes: np.ndarray, k0: int):
+    """Amorçage vectorisé, en O(#premiers) opérations numpy, depuis n'importe quel octet k0
+    (entier 30*k0) : pour chaque premier p >= 7 et chaque résidu w, octet absolu du premier
+    multiple p*q (q ≡ w mod 30, q >= p) à partir de k0, et indice du bit à effacer.
+    Renvoie deux tableaux (n, 8) : next_mults (int64) et bits (uint8)."""
+    p = np.asarray(primes, dtype=np.int64)[:, None]
+    w = WHEEL_RESIDUES[None, :]
+    # q >= max(p, ceil(30*k0 / p)), calculé sans dépasser int64
+    q_lo = np.maximum(WHEEL * (k0 // p) - (-(WHEEL * (k0 % p)) // p), p)
+    m = np.maximum(-(-(q_lo - w) // WHEEL), 0)
+    next_mults = p * m + (p * w) // WHEEL
+    bits = _WHEEL_BITIDX[(p * w) % WHEEL]
+    return next_mults, bits
+
+
+def _build_presieve(primes) -> np.ndarray:
+    # Bitmap périodique (période = produit des premiers, en octets) où tous les multiples
+    # de ces premiers, eux compris, sont déjà effacés
+    period = math.prod(primes)
+    pattern = np.full(period, 0xFF, dtype=np.uint8)
+    for p in primes:
+        for w in WHEEL_RESIDUES.tolist():
+            pattern[(p * w) // WHEEL::p] &= ~(1 << int(_WHEEL_BITIDX[(p * w) % WHEEL])) & 0xFF
+    return pattern
+
+
+# Pré-crible : motif de 7·11·13·17·19 = 323 323 octets (~316 Kio), recopié avec la bonne
+# phase au début de chaque segment à la place de np.full(…, 0xFF)
+PRESIEVE_PRIMES = (7, 11, 13, 17, 19)
+_PRESIEVE = _build_presieve(PRESIEVE_PRIMES)
+
+
+def presieved_segment(k0: int, size: int) -> np.ndarray:
+    """Bitmap des octets [k0, k0 + size) avec les multiples de PRESIEVE_PRIMES déjà effacés."""
+    period = _PRESIEVE.size
+    seg = np.empty(size, dtype=np.uint8)
+    off = k0 % period
+    done = min(size, period - off)
+    seg[:done] = _PRESIEVE[off:off + done]
+    while done < size:
+        n = min(size - done, period)
+        seg[done:done + n] = _PRESIEVE[:n]
+        done += n
+    if k0 == 0:
+        seg[0] = 0xFE  # 1 n'est pas premier ; 7…29 le sont
+    return seg
+
+
+def wheel_primes(k0: int, seg: np.ndarray) -> np.ndarray:
+    """Premiers (uint64, croissants) encodés par la bitmap seg commençant à l'octet k0."""
+    idx = np.flatnonzero(np.unpackbits(seg, bitorder='little').view(np.bool_))
+    k = (idx >> 3).astype(np.uint64) + np.uint64(k0)
+    primes = k * np.uint64(WHEEL) + _WHEEL_RESIDUES_U64[idx & 7]
+    if WHEEL * (k0 + seg.size) > 1 << 64:
+        # Dernier octet sous 2^64 : ses résidus au-delà débordent (valeurs repliées)
+        primes = primes[primes >= np.uint64(WHEEL * k0)]
+    return primes
+
+
+class WheelSieve:
+    """État du crible segmenté mod 30, reporté d'un segment au suivant.
+
+    Les premiers de PRESIEVE_PRIMES sont couverts par le motif de pré-crible. Les petits
+    premiers suivants gardent leurs prochains multiples (octet absolu par premier et
+    par résidu) et sont criblés par tranches. Si seg_bytes est donné, les grands premiers
+    (>= seg_bytes / BUCKET_HITS) vont dans des seaux indexés par bloc de seg_bytes octets :
+    un segment ne traite que les paires (premier, résidu) qui le touchent réellement.
+    Avec k_end, les paires dont le prochain multiple tombe au-delà de l'octet k_end sont
+    oubliées : pour un intervalle étroit loin de 0, la plupart des grands premiers.
+    """
+
+    def __init__(self, base_primes: np.ndarray, k_start: int = 0, seg_bytes: int = None,
+                 k_end: int = None):
+        primes = np.asarray(base_primes, dtype=np.int64)
+        primes = primes[primes > PRESIEVE_PRIMES[-1]]
+        split = primes.size
+        if seg_bytes:
+            split = int(np.searchsorted(primes, seg_bytes // BUCKET_HITS))
+        self.primes = primes[:split]
+        self.next_mults, bits = wheel_seed(self.primes, k_start)
+        self.masks = ~(np.uint8(1) << bits)
+
+        self.seg_bytes = seg_bytes
+        self.k_end = k_end
+        self.slices = 0         # tranches seg[off::p] émises (petits premiers)
+        self.bucket_marks = 0   # bits effacés depuis les seaux (grands premiers)
+        self._buckets = {}
+        self._kill = None
+        # Amorçage par paquets : la mémoire temporaire reste bornée même vers √(2^64)
+        large = primes[split:]
+        for lo in range(0, large.size, 1 << 20):
+            chunk = large[lo:lo + (1 << 20)]
+            if k_end is not None:
+                # Sans multiple p*q (q >= p) dans [30*k_start, 30*k_end), un premier est ignoré
+                q_lo = WHEEL * (k_start // chunk) - (-(WHEEL * (k_start % chunk)) // chunk)
+                q_hi = WHEEL * (k_end // chunk) + (WHEEL * (k_end % chunk) - 1) // chunk
+                chunk = chunk[q_hi >= np.maximum(q_lo, chunk)]
+                if not chunk.size:
+                    continue
+            nm, bits = wheel_seed(chunk, k_start)
+            self._file(np.repeat(chunk, 8), nm.ravel(), bits.ravel())
+
+    def _file(self, p: np.ndarray, nxt: np.ndarray, bits: np.ndarray):
+        # Range les paires dans le seau du bloc contenant leur prochain multiple
+        if self.k_end is not None:
+            keep = nxt < self.k_end
+            p, nxt, bits = p[keep], nxt[keep], bits[keep]
+            if not nxt.size:
+                return
+        blk = nxt // self.seg_bytes
+        order = np.argsort(blk, kind='stable')
+        p, nxt, bits, blk = p[order], nxt[order], bits[order], blk[order]
+        cuts = (np.flatnonzero(np.diff(blk)) + 1).tolist()
+        for lo, hi in zip([0] + cuts, cuts + [blk.size]):
+            self._buckets.setdefault(int(blk[lo]), []).append((p[lo:hi], nxt[lo:hi], bits[lo:hi]))
+
+    def _sieve_buckets(self, seg: np.ndarray, k0: int, k1: int):
+        chunks = []
+        for b in range(k0 // self.seg_bytes, (k1 - 1) // self.seg_bytes + 1):
+            chunks.extend(self._buckets.pop(b, ()))
+        if not chunks:
+            return
+        p = np.concatenate([c[0] for c in chunks])
+        nxt = np.concatenate([c[1] for c in chunks])
+        bits = np.concatenate([c[2] for c in chunks])
+
+        # Bits à effacer marqués à part puis appliqués en un seul ET : deux paires
+        # peuvent toucher le même octet dans la même passe.
+        n_bits = 8 * seg.size
+        if self._kill is None or self._kill.size < n_bits:
+            self._kill = np.zeros(n_bits, dtype=np.bool_)
+        kill = self._kill[:n_bits]
+        kill.fill(False)
+        live = np.flatnonzero(nxt < k1)
+        while live.size:
+            self.bucket_marks += live.size
+            kill[((nxt[live] - k0) << 3) + bits[live]] = True
+            nxt[live] += p[live]
+            live = live[nxt[live] < k1]
+        seg &= np.packbits(~kill, bitorder='little')
+        self._file(p, nxt, bits)
+
+    def sieve(self, k0: int, k1: int) -> np.ndarray:
+        """Crible les octets [k0, k1), c.-à-d. les entiers [30*k0, 30*k1) ; renvoie la bitmap.
+        Avec des seaux, un segment ne doit pas dépasser seg_bytes octets."""
+        size = k1 - k0
+        seg = presieved_segment(k0, size)
+
+        limit = int(np.searchsorted(self.primes, math.isqrt(WHEEL * k1 - 1), side='right'))
+        if limit:
+            p = self.primes[:limit]
+            nm = self.next_mults[:limit]
+            self.slices += int(np.count_nonzero(nm < k1))
+            for pi, offs, mks in zip(p.tolist(), (nm - k0).tolist(), self.masks[:limit].tolist()):
+                for off, mk in zip(offs, mks):
+                    if off < size:
+                        seg[off::pi] &= mk
+            # Avance vectorisée des multiples au-delà du segment
+            pc = p[:, None]
+            nm += np.where(nm < k1, -(-(k1 - nm) // pc) * pc, 0)
+
+        if self._buckets:
+            self._sieve_buckets(seg, k0, k1)
+        return seg
+
+
+# Premiers < 49 : cas de base de primes_up_to (49 = 7², premier carré hors pré-crible)
+_SMALL_PRIMES = np.array([2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41, 43, 47], dtype=np.int64)
+
+
+def primes_up_to(limit: int, seg_bytes: int = 1 << 18) -> np.ndarray:
+    """Tous les premiers <= limit (int64, croissants), par le même crible de roue
+    segmenté, amorcé récursivement avec les premiers <= √limit."""
+    if limit < 49:
+        return _SMALL_PRIMES[_SMALL_PRIMES <= limit]
+    sieve = WheelSieve(primes_up_to(math.isqrt(limit)), 0, seg_bytes)
+    k_end = limit // WHEEL + 1
+    chunks = [_SMALL_PRIMES[:3]]
+    for k0 in range(0, k_end, seg_bytes):
+        k1 = min(k0 + seg_bytes, k_end)
+        chunks.append(wheel_primes(k0, sieve.sieve(k0, k1)).astype(np.int64))
+    primes = np.concatenate(chunks)
+    return primes[:np.searchsorted(primes, limit, side='right')]
+
+
+def prime_pi(x: int) -> int:
+    """π(x) exact, sans cribler jusqu'à x : méthode combinatoire de Legendre–Meissel sous
+    la forme de Lucy (S(v) sur les O(√x) valeurs v = x // k), une passe vectorisée par
+    premier p <= √x. O(x^(3/4) / ln x) opérations, O(√x) mémoire."""
+    x = int(x)
+    if x < 2:
+        return 0
+    r = math.isqrt(x)
+    # lo[v] = S(v) pour v <= r ; hi[k - 1] = S(x // k) pour k <= r.
+    # Au départ S(v) = v - 1 (tous les entiers de [2, v]) ; après la passe de p, seuls
+    # restent les premiers et les entiers sans facteur <= p.
+    lo = np.arange(-1, r, dtype=np.int64)
+    lo[0] = 0
+    hi = x // np.arange(1, r + 1, dtype=np.int64) - 1
+    for p in primes_up_to(r).tolist():
+        sp = int(lo[p - 1])  # π(p - 1)
+        p2 = p * p
+        k_max = min(r, x // p2)
+        # S(x // kp) : dans hi tant que kp <= r (tranche de pas p), dans lo au-delà
+        k_in = min(k_max, r // p)
+        sub = np.empty(k_max, dtype=np.int64)
+        sub[:k_in] = hi[p - 1:p * k_in:p]
+        k = np.arange(k_in + 1, k_max + 1, dtype=np.int64)
+        if x < 1 << 52:
+            # x // (kp) == (x // p) // k ; division flottante exacte tant que x < 2^52
+            sub[k_in:] = lo[(float(x // p) / k).astype(np.int64)]
+        else:
+            sub[k_in:] = lo[x // (k * p)]
+        hi[:k_max] -= sub - sp
+        if p2 <= r:
+            # S(v // p) pour v = p², …, r : chaque valeur de lo[p:] répétée p fois
+            lo[p2:] -= np.repeat(lo[p:r // p + 1], p)[:r - p2 + 1] - sp
+    return int(hi[0])
+
+
+def nth_prime_window(n: int, k: int = 0, seg_bytes: int = 1 << 18) -> np.ndarray:
+    """[p_n, …, p_{n+k}] (uint64) sans générer les premiers précédents : π exact juste
+    sous l'estimation R⁻¹(n), puis crible segmenté local jusqu'à p_{n+k}. Mémoire O(√x)."""
+    n, k = int(n), int(k)
+    if n < 1 or k < 0:
+        raise ValueError("n >= 1 et k >= 0 requis.")
+    if n < 1000:
+        # Début de suite (2, 3, 5 compris) : le flux ordinaire, la fenêtre étant de toute façon en O(k)
+        return np.concatenate(list(iter_primes(0, None, n + k, seg_bytes)))[n - 1:]
+
+    # Point de départ lo avec π(lo) < n, à ~2√x sous p_n
+    x = inverse_riemann_r(n)
+    lo = int(x - 2 * math.sqrt(x)) - 64
+    count = prime_pi(lo)
+    while count >= n:
+        lo -= int((count - n + 1) * math.log(lo) + math.sqrt(lo))
+        count = prime_pi(lo)
+
+    # Premiers de base jusqu'à √(2·p_{n+k}) : largement au-delà de la fin du crible
+    end = inverse_riemann_r(n + k)
+    limit = int(math.isqrt(int(2 * end))) + 1
+    sieve_end = limit * limit
+    k0 = (lo + 1) // WHEEL
+    sieve = WheelSieve(primes_up_to(limit)[3:], k0, seg_bytes)
+    chunks, have = [], 0
+    want = n + k - count  # rang de p_{n+k} parmi les premiers > lo
+    while have < want:
+        k1 = min(k0 + seg_bytes, sieve_end // WHEEL)
+        if k0 >= k1:
+            raise RuntimeError("Crible local au-delà des premiers de base.")
+        primes = wheel_primes(k0, sieve.sieve(k0, k1))
+        primes = primes[np.searchsorted(primes, np.uint64(lo), side='right'):]
+        chunks.append(primes)
+        have += primes.size
+        k0 = k1
+    return np.concatenate(chunks)[n - count - 1:want]
+
+
+def nth_prime(n: int) -> int:
+    """p_n exact (n >= 1), voir nth_prime_window."""
+    return int(nth_prime_window(n)[0])
+
+
+# Premiers de base propres à chaque processus du pool (envoyés une seule fois)
+_POOL_PRIMES = None
+
+
+def _pool_init(odd_primes: np.ndarray):
+    # Ctrl-C atteint tout le groupe de processus : seul le processus principal y réagit
+    # (arrêt propre), un worker interrompu ferait échouer son future en plein run
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    global _POOL_PRIMES
+    _POOL_PRIMES = odd_primes
+
+
+def _pool_sieve_segment(k0: int, k1: int, timed: bool = False):
+    # Chaque worker calcule ses propres multiples de départ pour son segment. timed : renvoie
+    # aussi les intervalles et compteurs de ses phases, fusionnés par le processus principal
+    prof = Profiler(trace=True) if timed else _NO_PROFILE
+    with prof.phase("seed"):
+        limit_idx = int(np.searchsorted(_POOL_PRIMES, math.isqrt(WHEEL * k1 - 1), side='right'))
+        sieve = WheelSieve(_POOL_PRIMES[:limit_idx], k0, k1 - k0, k1)
+    with prof.phase("mark"):
+        seg = sieve.sieve(k0, k1)
+    with prof.phase("extract"):
+        primes = wheel_primes(k0, seg)
+    if not timed:
+        return primes
+    prof.count("slices", sieve.slices)
+    prof.count("bucket_marks", sieve.bucket_marks)
+    return primes, prof.events, prof.counters
+
+
+# ---------- Flux de premiers ----------
+def _segment_bounds(ub: int, seg_bytes: int, k0: int = 0):
+    # Segments [k0, k1) en octets de roue, jusqu'à la borne ub incluse
+    k_end = ub // WHEEL + 1
+    while k0 < k_end:
+        k1 = min(k0 + seg_bytes, k_end)
+        yield k0, k1
+        k0 = k1
+
+
+def _serial_blocks(odd_primes: np.ndarray, ub: int, seg_bytes: int, k_start: int = 0,
+                   profiler: Profiler = None):
+    # Segments criblés dans ce thread, next_mults reporté d'un segment à l'autre
+    prof = profiler or _NO_PROFILE
+    with prof.phase("seed"):
+        sieve = WheelSieve(odd_primes, k_start, seg_bytes, ub // WHEEL + 1)
+    try:
+        for k0, k1 in _segment_bounds(ub, seg_bytes, k_start):
+            with prof.phase("mark"):
+                seg = sieve.sieve(k0, k1)
+            with prof.phase("extract"):
+                primes = wheel_primes(k0, seg)
+            prof.count("segments")
+            prof.count("bitmap_bytes", k1 - k0)
+            yield primes
+    finally:
+        prof.count("slices", sieve.slices)
+        prof.count("bucket_marks", sieve.bucket_marks)
+
+
+def _parallel_blocks(odd_primes: np.ndarray, ub: int, seg_bytes: int, workers: int,
+                     k_start: int = 0, max_pending: int = None, profiler: Profiler = None):
+    # Segments indépendants criblés par un pool de processus, restitués dans l'ordre.
+    # Au plus max_pending segments en vol (2 par worker par défaut) : la mémoire reste bornée.
+    # Phases des workers préfixées « worker/ » ; « wait » : attente du processus principal.
+    prof = profiler or _NO_PROFILE
+    max_pending = max(1, max_pending or 2 * workers)
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_pool_init,
+        initargs=(odd_primes,),
+    )
+    pending = deque()
+
+    def take():
+        k0, k1, future = pending.popleft()
+        with prof.phase("wait"):
+            out = future.result()
+        prof.count("segments")
+        prof.count("bitmap_bytes", k1 - k0)
+        if not prof.enabled:
+            return out
+        primes, events, counters = out
+        prof.merge(events, counters, "worker/")
+        return primes
+
+    try:
+        for k0, k1 in _segment_bounds(ub, seg_bytes, k_start):
+            pending.append((k0, k1, pool.submit(_pool_sieve_segment, k0, k1, prof.enabled)))
+            if len(pending) >= max_pending:
+                yield take()
+        while pending:
+            yield take()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_primes(start: int = 0, stop: int = None, count: int = None, seg_bytes: int = 1 << 18,
+                workers: int = 1, max_pending: int = None, on_status=None, profiler: Profiler = None):
+    """Premiers de [start, stop] dans l'ordre (au plus count), par tableaux uint64 contigus,
+    un par segment de crible. Sans stop, la borne est certifiée pour count premiers depuis 0 ;
+    depuis start > 0, des fenêtres d'environ count·ln(x) entiers sont criblées tour à tour.
+    Générateur paresseux : un segment n'est criblé que lorsque le consommateur le demande
+    (avec workers > 1, au plus max_pending segments d'avance). La mémoire reste
+    O(√stop + segment) ; close() arrête le crible et le pool. profiler : phases bound,
+    base_sieve, seed, mark, extract (ou wait et worker/…) et compteurs du crible."""
+    prof = profiler or _NO_PROFILE
+    if stop is None:
+        if count is None:
+            raise ValueError("stop ou count requis")
+        if start > 2:
+            # π(start - 1) exact coûterait O(start^3/4) : fenêtres [lo, hi] de ~1,1·count·ln(hi)
+            # entiers (un segment au moins), suivies d'autres tant que count n'est pas atteint
+            remaining, lo = int(count), int(start)
+            while remaining > 0 and lo < 1 << 64:
+                width = 1.1 * remaining * math.log(lo + remaining * math.log(lo))
+                hi = min(lo + max(int(width), WHEEL * seg_bytes), (1 << 64) - 1)
+                blocks = iter_primes(lo, hi, remaining, seg_bytes, workers, max_pending, on_status, profiler)
+                try:
+                    for primes in blocks:
+                        remaining -= primes.size
+                        yield primes
+                finally:
+                    blocks.close()
+                lo = hi + 1
+            return
+        with prof.phase("bound"):
+            stop = upper_bound_nth_prime(count)
+    start, stop = max(int(start), 0), int(stop)
+    if stop >= 1 << 64:
+        raise ValueError("stop < 2^64 requis")
+    remaining = sys.maxsize if count is None else int(count)
+    if remaining <= 0 or start > stop:
+        return
+
+    # 2, 3 et 5 : hors de la roue
+    head = np.array([2, 3, 5], dtype=np.uint64)
+    head = head[(head >= start) & (head <= stop)][:remaining]
+    if head.size:
+        remaining -= head.size
+        yield head
+        if not remaining:
+            return
+
+    status = on_status or (lambda message: None)
+    status("Crible de base jusqu'à √borne…")
+    with prof.phase("base_sieve"):
+        odd_primes = primes_up_to(int(math.isqrt(stop)) + 1)[1:]
+
+    status("Crible segmenté en cours…")
+    # Le crible démarre à l'octet de roue de start, les multiples sont ensemencés directement
+    # à cet octet (base jusqu'à √stop seulement : le coût suit la largeur de l'intervalle)
+    skip = max(start - 1, 0)
+    k_start = start // WHEEL
+    if workers > 1:
+        blocks = _parallel_blocks(odd_primes, stop, seg_bytes, workers, k_start, max_pending, prof)
+    else:
+        blocks = _serial_blocks(odd_primes, stop, seg_bytes, k_start, prof)
+    try:
+        for primes in blocks:
+            if skip:
+                primes = primes[np.searchsorted(primes, np.uint64(skip), side='right'):]
+            primes = primes[:np.searchsorted(primes, np.uint64(stop), side='right')]
+            if primes.size > remaining:
+                primes = primes[:remaining]
+            if primes.size:
+                remaining -= primes.size
+                yield primes
+            if not remaining:
+                return
+    finally:
+        blocks.close()
+
+
+# ---------- Stockage des premiers ----------
+# Deux formats sur disque :
+#  - "uint64" (.dat)  : un np.uint64 par premier, fichier pré-dimensionné (8 octets/premier) ;
+#  - "gaps"   (.gaps) : écarts compressés. Par bloc d'au plus GAP_BLOCK premiers, le premier
+#    est stocké en absolu dans l'index (.gaps.idx) et les suivants comme demi-écarts
+#    (uint8, ou uint16 si un écart du bloc dépasse 510) dans le fichier de données.
+#    ~1 octet/premier ; toute plage de lignes se décode en O(bloc) ;
+#  - "bits"   (.bits) : la bitmap de roue elle-même (1 octet pour 30 entiers) et un index
+#    de rang (.bits.idx, nombre de premiers avant chaque superbloc) : pi(x) et n-ième
+#    premier en O(superbloc). Plus compact que "gaps" tant que ln(x) < 30.
+GAP_BLOCK = 4096
+_GAP_INDEX_DTYPE = np.dtype([
+    ('row', '<u8'),      # indice du premier élément du bloc
+    ('base', '<u8'),     # sa valeur (point de reprise absolu)
+    ('offset', '<u8'),   # position des demi-écarts dans le fichier de données
+    ('count', '<u4'),    # nombre de premiers du bloc
+    ('width', '<u4'),    # 1 ou 2 octets par demi-écart
+])
+
+
+BITS_SUPERBLOCK = 1024  # octets de bitmap par superbloc (30 720 entiers)
+_BITS_HEADER_DTYPE = np.dtype([
+    ('origin', '<u8'),      # octet de roue du début de la bitmap
+    ('head', '<u8'),        # premiers hors roue présents en tête (bit 0: 2, bit 1: 3, bit 2: 5)
+    ('superblock', '<u8'),
+    ('reserved', '<u8'),
+])
+_POPCOUNT8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+# _WHEEL_LE_MASK[r] : bits de l'octet dont le résidu est <= r
+_WHEEL_LE_MASK = np.array(
+    [int(sum(1 << j for j, w in enumerate(WHEEL_RESIDUES.tolist()) if w <= r)) for r in range(WHEEL)],
+    dtype=np.uint8,
+)
+
+
+def _index_path(path: Path) -> Path:
+    return Path(str(path) + ".idx")
+
+
+def _meta_path(path: Path) -> Path:
+    return Path(str(path) + ".meta.json")
+
+
+def pyramid_path(path: Path) -> Path:
+    return Path(str(path) + ".pyr")
+
+
+def store_files(path: Path) -> list:
+    """Fichiers composant le magasin situé à path."""
+    path = Path(path)
+    files = [path, _meta_path(path)]
+    if path.suffix in (".gaps", ".bits"):
+        files.insert(1, _index_path(path))
+    return files + [pyramid_path(path)]
+
+
+def _files_size(path: Path) -> int:
+    # Octets occupés sur disque par le magasin et ses fichiers annexes
+    return sum(f.stat().st_size for f in store_files(path) if f.exists())
+
+
+# Verrou d'écriture : fichier .lock créé en exclusif (O_EXCL) avec le PID de l'écrivain. Un
+# verrou dont le processus n'existe plus (plantage) est repris. Deux processus ne peuvent
+# donc pas prolonger le même magasin en même temps.
+def _lock_path(path: Path) -> Path:
+    path = Path(path)
+    return path.with_name(path.name + ".lock")
+
+
+def pid_alive(pid: int) -> bool:
+    """Vrai si le processus pid existe encore."""
+    if pid <= 0:
+        return False
+    if os.name == "nt":
+        # os.kill(pid, 0) terminerait le processus sous Windows
+        import ctypes
+        kernel32 = ctypes.windll.kernel32
+        handle = kernel32.OpenProcess(0x1000, False, pid)   # PROCESS_QUERY_LIMITED_INFORMATION
+        if not handle:
+            return False
+        code = ctypes.c_ulong()
+        ok = kernel32.GetExitCodeProcess(handle, ctypes.byref(code))
+        kernel32.CloseHandle(handle)
+        return bool(ok) and code.value == 259   # STILL_ACTIVE
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def store_locked(path: Path) -> bool:
+    """Vrai si un processus vivant écrit actuellement le magasin path."""
+    lock = _lock_path(path)
+    try:
+        text = lock.read_text().strip()
+        age = time.time() - lock.stat().st_mtime
+    except OSError:
+        return False
+    if not text.isdigit():
+        return age < 5.0   # PID pas encore écrit par le créateur du verrou
+    return pid_alive(int(text))
+
+
+def acquire_store_lock(path: Path) -> bool:
+    """Prend le verrou d'écriture du magasin ; False s'il est tenu par un processus vivant."""
+    lock = _lock_path(path)
+    for _ in range(2):
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+        except FileExistsError:
+            if store_locked(path):
+                return False
+            try:
+                lock.unlink()   # verrou orphelin
+            except FileNotFoundError:
+                pass
+            continue
+        with os.fdopen(fd, "w") as f:
+            f.write(str(os.getpid()))
+        return True
+    return False
+
+
+def release_store_lock(path: Path):
+    try:
+        _lock_path(path).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def read_store_meta(path: Path):
+    """Métadonnées / point de reprise du magasin, ou None si absentes ou illisibles :
+    format, count, pmax, sum, current (prochain entier à cribler), target (nombre visé)
+    et range ((a, b) pour un magasin d'intervalle, sinon None)."""
+    try:
+        with open(_meta_path(path), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        out = {k: meta[k] for k in ("format", "count", "pmax", "sum")}
+        out["current"] = int(meta.get("current", out["pmax"] + 1))
+        out["target"] = int(meta.get("target", out["count"]))
+        out["range"] = tuple(meta["range"]) if meta.get("range") else None
+        out["stats"] = meta.get("stats")
+        return out
+    except Exception:
+        return None
+
+
+def store_meta_pending(meta) -> bool:
+    """Vrai si la génération décrite par meta s'est arrêtée avant son terme."""
+    if meta["range"] is not None:
+        return meta["current"] <= meta["range"][1]
+    return meta["count"] < meta["target"]
+
+
+def write_store_meta(path: Path, fmt: str, count: int, pmax: int, total_sum: int, target: int = None,
+                     current: int = None, prime_range: tuple = None, stats: dict = None):
+    # Écriture atomique : fichier temporaire synchronisé puis os.replace
+    meta_path = _meta_path(path)
+    tmp = meta_path.with_name(meta_path.name + ".tmp")
+    meta = {
+        "format": fmt,
+        "count": int(count),
+        "pmax": int(pmax),
+        "sum": int(total_sum),
+        "current": int(pmax) + 1 if current is None else int(current),
+        "target": int(count if target is None else target),
+    }
+    if prime_range is not None:
+        meta["range"] = [int(prime_range[0]), int(prime_range[1])]
+    if stats is not None:
+        meta["stats"] = stats
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, meta_path)
+
+
+# Les writers acceptent start : None crée un magasin vide ; un entier rouvre le magasin
+# existant, le tronque à ses start premières lignes et poursuit l'écriture à leur suite.
+# readable : lignes déjà lisibles par un lecteur concurrent (open_store puis refresh()).
+class MemmapStoreWriter:
+    """Magasin historique : np.memmap uint64 pré-dimensionné à capacity premiers (agrandi
+    au besoin quand capacity n'est qu'une estimation, p. ex. pour un intervalle)."""
+
+    @staticmethod
+    def disk_bytes(count: int, lo: int, hi: int) -> int:
+        # Place disque pour ajouter count premiers de ]lo, hi]
+        return 8 * count
+
+    def __init__(self, path: Path, capacity: int, start: int = None):
+        self.path = Path(path)
+        capacity = max(1, int(capacity))
+        if start is None:
+            self._mm = np.memmap(path, dtype=np.uint64, mode='w+', shape=(capacity,))
+            self.count = 0
+        else:
+            self._resize(capacity)
+            self.count = min(int(start), capacity)
+
+    def _resize(self, capacity: int):
+        self._mm = None
+        with open(self.path, "r+b") as f:
+            f.truncate(8 * capacity)
+        self._mm = np.memmap(self.path, dtype=np.uint64, mode='r+', shape=(capacity,))
+
+    def append(self, primes: np.ndarray):
+        end = self.count + primes.size
+        if end > self._mm.size:
+            self._mm.flush()
+            self._resize(max(end, self._mm.size + self._mm.size // 4))
+        self._mm[self.count:end] = primes
+        self.count = end
+
+    @property
+    def readable(self) -> int:
+        return self.count
+
+    def flush(self):
+        self._mm.flush()
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm = None
+            # Capacité estimée (intervalle) ou run interrompu : le fichier ne garde que les lignes
+            # écrites, sans la fin à zéro (une reprise le réagrandit). Un fichier vide ne se
+            # projette pas en mémoire : un emplacement reste pour un magasin sans premier.
+            try:
+                with open(self.path, "r+b") as f:
+                    f.truncate(8 * max(1, self.count))
+            except OSError:
+                pass    # fichier encore projeté par un lecteur (Windows) : les métadonnées font foi
+
+
+class GapStoreWriter:
+    """Écriture en flux d'un magasin à écarts. Chaque append() écrit des blocs complets
+    (données puis index) : un lecteur concurrent ne voit jamais de bloc à moitié écrit."""
+
+    @staticmethod
+    def disk_bytes(count: int, lo: int, hi: int) -> int:
+        # Demi-écarts sur 1 octet par bloc sans écart > 510. Le premier écart > 510 (514 après
+        # 304 599 508 537, ~3e11) passe son bloc en 2 octets, mais ces blocs restent rares
+        # jusque vers 4e12 : 1 octet compté en deçà, 2 au-delà
+        width = 1 if hi < 4 * 10 ** 12 else 2
+        return width * count + (count // GAP_BLOCK + 2) * _GAP_INDEX_DTYPE.itemsize
+
+    def __init__(self, path: Path, capacity: int = 0, start: int = None):
+        self.path = Path(path)
+        if start:
+            self._reopen(int(start))
+        else:
+            self._data = open(self.path, "wb")
+            self._index = open(_index_path(self.path), "wb")
+            self._offset = 0
+            self.count = 0
+
+    def _reopen(self, start: int):
+        store = GapStore(self.path)
+        start = min(start, len(store))
+        b = int(np.searchsorted(store._rows, start - 1, side='right')) - 1
+        rec = store._index[b:b + 1].copy()
+        rec['count'] = start - int(rec['row'][0])
+        data_end = int(rec['offset'][0]) + (int(rec['count'][0]) - 1) * int(rec['width'][0])
+        del store
+        self._data = open(self.path, "r+b")
+        self._data.truncate(data_end)
+        self._data.seek(data_end)
+        self._index = open(_index_path(self.path), "r+b")
+        self._index.truncate(b * _GAP_INDEX_DTYPE.itemsize)
+        self._index.seek(0, os.SEEK_END)
+        self._index.write(rec.tobytes())
+        self._index.flush()
+        self._offset = data_end
+        self.count = start
+
+    def _write_block(self, primes: np.ndarray):
+        half = np.diff(primes) >> np.uint64(1)
+        width = 1 if half.size == 0 or int(half.max()) <= 0xFF else 2
+        payload = half.astype(np.uint8 if width == 1 else '<u2').tobytes()
+        self._data.write(payload)
+        rec = np.array([(self.count, int(primes[0]), self._offset, primes.size, width)],
+                       dtype=_GAP_INDEX_DTYPE)
+        self._offset += len(payload)
+        self.count += int(primes.size)
+        return rec
+
+    def append(self, primes: np.ndarray):
+        primes = np.asarray(primes, dtype=np.uint64)
+        recs = []
+        if primes.size and primes[0] == 2:
+            # 2 -> 3 est le seul écart impair : 2 forme un bloc à lui seul
+            recs.append(self._write_block(primes[:1]))
+            primes = primes[1:]
+        for lo in range(0, primes.size, GAP_BLOCK):
+            recs.append(self._write_block(primes[lo:lo + GAP_BLOCK]))
+        if recs:
+            self._data.flush()
+            self._index.write(np.concatenate(recs).tobytes())
+            self._index.flush()
+
+    @property
+    def readable(self) -> int:
+        return self.count   # append() n'écrit que des blocs complets
+
+    def flush(self):
+        for f in (self._data, self._index):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        if not self._data.closed:
+            self._data.close()
+            self._index.close()
+
+
+class BitmapStoreWriter:
+    """Écriture en flux d'un magasin bitmap à partir de tableaux de premiers croissants.
+    Le dernier octet reste en mémoire tant qu'un append() suivant peut le compléter ;
+    l'index reçoit un compte cumulé à chaque frontière de superbloc franchie."""
+
+    @staticmethod
+    def disk_bytes(count: int, lo: int, hi: int) -> int:
+        # Un octet par tranche de 30 entiers, quel que soit le nombre de premiers
+        n_bytes = (hi - lo) // WHEEL + 1
+        return n_bytes + (n_bytes // BITS_SUPERBLOCK + 2) * 8 + _BITS_HEADER_DTYPE.itemsize
+
+    def __init__(self, path: Path, capacity: int = 0, start: int = None):
+        self.path = Path(path)
+        self._head = 0
+        self._origin = None
+        self._k = 0          # octet de roue en attente
+        self._tail = 0       # sa valeur
+        self._written = 0    # octets de bitmap écrits
+        self._ranked = 0     # premiers contenus dans ces octets
+        self.count = 0
+        store = BitmapStore(self.path) if start else None
+        if store is None or min(start, len(store)) <= store._head.size:
+            head = store._head[:start] if store is not None else None
+            del store
+            self._data = open(self.path, "wb")
+            self._index = open(_index_path(self.path), "wb")
+            if head is not None:
+                self.append(head)
+        else:
+            self._reopen(store, min(int(start), len(store)))
+
+    def _reopen(self, store, start: int):
+        # Le dernier premier conservé fixe l'octet en attente (tronqué après son bit)
+        last = store.select(start - 1)
+        b = last // WHEEL - store._origin
+        n_cum = b // store._sb + 1
+        self._origin = store._origin
+        self._head = int(sum(1 << (0, 1, None, 2)[int(p) - 2] for p in store._head))
+        self._k = self._origin + b
+        self._tail = int(store._data[b] & _WHEEL_LE_MASK[last % WHEEL])
+        self._written = b
+        self._ranked = int(store._cum[n_cum - 1]) + \
+            int(_POPCOUNT8[store._data[(n_cum - 1) * store._sb:b]].sum(dtype=np.int64))
+        self.count = start
+        del store
+        self._data = open(self.path, "r+b")
+        self._data.truncate(b)
+        self._data.seek(b)
+        self._index = open(_index_path(self.path), "r+b")
+        self._index.truncate(_BITS_HEADER_DTYPE.itemsize + 8 * n_cum)
+        self._index.seek(0, os.SEEK_END)
+
+    def _start(self, origin: int):
+        self._origin = self._k = origin
+        header = np.array([(origin, self._head, BITS_SUPERBLOCK, 0)], dtype=_BITS_HEADER_DTYPE)
+        self._index.write(header.tobytes())
+        self._index.write(np.zeros(1, dtype='<u8').tobytes())  # 0 premier avant le superbloc 0
+        self._index.flush()
+
+    def _write(self, chunk: np.ndarray):
+        if not chunk.size:
+            return
+        self._data.write(chunk.tobytes())
+        self._data.flush()
+        pc = np.cumsum(_POPCOUNT8[chunk], dtype=np.uint64)
+        end = self._written + chunk.size
+        bounds = np.arange((self._written // BITS_SUPERBLOCK + 1) * BITS_SUPERBLOCK, end + 1,
+                           BITS_SUPERBLOCK)
+        if bounds.size:
+            cum = np.uint64(self._ranked) + pc[bounds - self._written - 1]
+            self._index.write(cum.astype('<u8').tobytes())
+            self._index.flush()
+        self._written = end
+        self._ranked += int(pc[-1])
+
+    def append(self, primes: np.ndarray):
+        primes = np.asarray(primes, dtype=np.uint64)
+        small = int(np.searchsorted(primes, 7))
+        if small:
+            if self._origin is not None:
+                raise ValueError("Premiers non croissants.")
+            for p in primes[:small].tolist():
+                self._head |= 1 << (0, 1, None, 2)[p - 2]
+            self.count += small
+            primes = primes[small:]
+        if not primes.size:
+            return
+        k = (primes // np.uint64(WHEEL)).astype(np.int64)
+        if self._origin is None:
+            self._start(int(k[0]))
+        bits = np.zeros((int(k[-1]) - self._k + 1) * 8, dtype=np.bool_)
+        bits[((k - self._k) << 3) + _WHEEL_BITIDX[(primes % np.uint64(WHEEL)).astype(np.int64)]] = True
+        chunk = np.packbits(bits, bitorder='little')
+        chunk[0] |= self._tail
+        self._write(chunk[:-1])
+        self._k, self._tail = int(k[-1]), int(chunk[-1])
+        self.count += int(primes.size)
+
+    @property
+    def readable(self) -> int:
+        # Octets écrits seulement : l'octet en attente et, avant l'en-tête, 2, 3 et 5 manquent
+        if self._origin is None:
+            return 0
+        return bin(self._head).count("1") + self._ranked
+
+    def flush(self):
+        # L'octet en attente est aussi écrit (à sa place, sans avancer) pour que le
+        # magasin sur disque contienne bien self.count premiers
+        if self._origin is not None:
+            self._data.write(bytes([self._tail]))
+            self._data.seek(self._written)
+        else:
+            # Seulement 2, 3 ou 5 : en-tête provisoire (réécrit par _start) pour que le
+            # magasin se rouvre avec ces premiers
+            self._start(0)
+            self._origin = None
+            self._index.seek(0)
+        for f in (self._data, self._index):
+            f.flush()
+            os.fsync(f.fileno())
+
+    def close(self):
+        if self._data.closed:
+            return
+        if self._origin is None:
+            self._start(0)
+        else:
+            self._write(np.array([self._tail], dtype=np.uint8))
+        self._data.close()
+        self._index.close()
+
+
+STORE_FORMATS = {
+    "uint64": (".dat", MemmapStoreWriter),
+    "gaps": (".gaps", GapStoreWriter),
+    "bits": (".bits", BitmapStoreWriter),
+}
+
+
+def create_store(path: Path, fmt: str, capacity: int, start: int = None):
+    return STORE_FORMATS[fmt][1](path, capacity, start)
+
+
+def _grow(buf: np.ndarray, n: int, new: np.ndarray) -> np.ndarray:
+    # new écrit après les n premières cases de buf, capacité doublée au besoin
+    end = n + new.size
+    if end > buf.size:
+        grown = np.empty(max(end, 2 * buf.size, 64), dtype=buf.dtype)
+        grown[:n] = buf[:n]
+        buf = grown
+    buf[n:end] = new
+    return buf
+
+
+class GapStore:
+    """Lecture d'un magasin à écarts avec l'interface utile d'un memmap : len(),
+    store[i] et store[a:b] (np.uint64). Le dernier bloc décodé est gardé en cache."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._recs = np.empty(0, dtype=_GAP_INDEX_DTYPE)
+        self._row_buf = np.empty(0, dtype=np.uint64)
+        self._base_buf = np.empty(0, dtype=np.uint64)
+        self._n_rec = 0
+        self._size = 0
+        self._data = np.empty(0, np.uint8)
+        self._cache = (-1, None)
+        self.refresh()
+
+    def refresh(self):
+        # Le magasin peut grandir pendant la génération : seuls les enregistrements d'index
+        # ajoutés depuis le dernier appel (et le dernier connu) sont relus, en O(nouveaux blocs)
+        idx_path = _index_path(self.path)
+        n_rec = idx_path.stat().st_size // _GAP_INDEX_DTYPE.itemsize if idx_path.exists() else 0
+        keep = max(0, min(self._n_rec, n_rec) - 1)
+        if n_rec > keep:
+            new = np.fromfile(idx_path, dtype=_GAP_INDEX_DTYPE, count=n_rec - keep,
+                              offset=keep * _GAP_INDEX_DTYPE.itemsize)
+            self._recs = _grow(self._recs, keep, new)
+            self._row_buf = _grow(self._row_buf, keep, new['row'])
+            self._base_buf = _grow(self._base_buf, keep, new['base'])
+            n_rec = keep + new.size
+        if self._cache[0] >= keep:
+            self._cache = (-1, None)
+        self._n_rec = n_rec
+        self._index = self._recs[:n_rec]
+        self._rows = self._row_buf[:n_rec]
+        self._bases = self._base_buf[:n_rec]
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if size != self._size:
+            self._data = np.memmap(self.path, dtype=np.uint8, mode='r') if size else np.empty(0, np.uint8)
+            self._size = size
+        self._len = int(self._rows[-1]) + int(self._index['count'][-1]) if n_rec else 0
+
+    def __len__(self):
+        return self._len
+
+    def _block(self, b: int) -> np.ndarray:
+        if self._cache[0] == b:
+            return self._cache[1]
+        rec = self._index[b]
+        count, width, off = int(rec['count']), int(rec['width']), int(rec['offset'])
+        raw = self._data[off:off + (count - 1) * width]
+        half = raw.view(np.uint8 if width == 1 else '<u2')
+        values = np.empty(count, dtype=np.uint64)
+        values[0] = rec['base']
+        np.cumsum(half, dtype=np.uint64, out=values[1:])
+        values[1:] <<= np.uint64(1)
+        values[1:] += rec['base']
+        self._cache = (b, values)
+        return values
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        start, stop = max(0, start), min(stop, self._len)
+        if start >= stop:
+            return np.empty(0, dtype=np.uint64)
+        b0 = int(np.searchsorted(self._rows, start, side='right')) - 1
+        b1 = int(np.searchsorted(self._rows, stop - 1, side='right')) - 1
+        parts = [self._block(b) for b in range(b0, b1 + 1)]
+        out = parts[0] if len(parts) == 1 else np.concatenate(parts)
+        lo = start - int(self._rows[b0])
+        return out[lo:lo + (stop - start)]
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._len)
+            return self.read(start, stop)[::step]
+        row = int(key)
+        if row < 0:
+            row += self._len
+        if not 0 <= row < self._len:
+            raise IndexError(row)
+        b = int(np.searchsorted(self._rows, row, side='right')) - 1
+        return self._block(b)[row - int(self._rows[b])]
+
+    def contains(self, values) -> np.ndarray:
+        """Pour chaque valeur (uint64), vrai si elle figure dans le magasin (un décodage
+        par bloc touché)."""
+        values = np.asarray(values, dtype=np.uint64)
+        out = np.zeros(values.shape, dtype=np.bool_)
+        if not self._len:
+            return out
+        blocks = np.searchsorted(self._bases, values, side='right') - 1
+        for b in np.unique(blocks[blocks >= 0]).tolist():
+            sel = np.flatnonzero(blocks == b)
+            block = self._block(b)
+            pos = np.minimum(np.searchsorted(block, values[sel]), block.size - 1)
+            out[sel] = block[pos] == values[sel]
+        return out
+
+    def searchsorted(self, x: int, side: str = "left") -> int:
+        """Comme np.searchsorted sur tout le magasin, pour une valeur : un seul bloc décodé."""
+        b = int(np.searchsorted(self._bases, np.uint64(x), side='right')) - 1
+        if b < 0:
+            return 0
+        return int(self._rows[b]) + int(np.searchsorted(self._block(b), np.uint64(x), side=side))
+
+
+class BitmapStore:
+    """Lecture d'un magasin bitmap : len(), store[i], store[a:b] par sélection (select)
+    et rank(x) = nombre de premiers stockés <= x, en O(superbloc)."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._cum_buf = np.empty(0, dtype=np.int64)
+        self._cum = self._cum_buf
+        self._size = 0
+        self._data = np.empty(0, np.uint8)
+        self.refresh()
+
+    def refresh(self):
+        # En-tête relu (32 octets, il peut être provisoire), puis seuls les comptes cumulés
+        # ajoutés depuis le dernier appel : O(nouveaux superblocs)
+        idx_path = _index_path(self.path)
+        n_cum = (idx_path.stat().st_size // 8 - 4) if idx_path.exists() else 0
+        if n_cum < 1:
+            header = np.zeros(1, dtype=_BITS_HEADER_DTYPE)[0]
+            self._cum_buf, n_cum = np.zeros(1, dtype=np.int64), 1
+        else:
+            header = np.fromfile(idx_path, dtype=_BITS_HEADER_DTYPE, count=1)[0]
+            keep = min(self._cum.size, n_cum)
+            new = np.fromfile(idx_path, dtype='<u8', count=n_cum - keep,
+                              offset=_BITS_HEADER_DTYPE.itemsize + 8 * keep)
+            self._cum_buf = _grow(self._cum_buf, keep, new.astype(np.int64))
+            n_cum = keep + new.size
+        self._origin = int(header['origin'])
+        self._sb = int(header['superblock']) or BITS_SUPERBLOCK
+        self._head = np.array([2, 3, 5], dtype=np.uint64)[[(int(header['head']) >> j) & 1 == 1 for j in range(3)]]
+        self._cum = self._cum_buf[:n_cum]
+        size = self.path.stat().st_size if self.path.exists() else 0
+        if size != self._size:
+            self._data = np.memmap(self.path, dtype=np.uint8, mode='r') if size else np.empty(0, np.uint8)
+            self._size = size
+        # Octets au-delà du dernier superbloc indexé : comptés directement
+        last = (self._cum.size - 1) * self._sb
+        tail = int(_POPCOUNT8[self._data[last:]].sum(dtype=np.int64))
+        self._len = self._head.size + int(self._cum[-1]) + tail
+        self._cache = (-1, None)
+
+    def __len__(self):
+        return self._len
+
+    def _superblock(self, i: int) -> np.ndarray:
+        if self._cache[0] == i:
+            return self._cache[1]
+        seg = self._data[i * self._sb:(i + 1) * self._sb]
+        values = wheel_primes(self._origin + i * self._sb, np.asarray(seg))
+        self._cache = (i, values)
+        return values
+
+    def read(self, start: int, stop: int) -> np.ndarray:
+        start, stop = max(0, start), min(stop, self._len)
+        if start >= stop:
+            return np.empty(0, dtype=np.uint64)
+        h = self._head.size
+        parts = [self._head[start:min(stop, h)]]
+        r0, r1 = max(start - h, 0), stop - h
+        if r1 > r0:
+            sb0 = int(np.searchsorted(self._cum, r0, side='right')) - 1
+            sb1 = int(np.searchsorted(self._cum, r1 - 1, side='right')) - 1
+            if sb0 == sb1:
+                body = self._superblock(sb0)
+            else:
+                seg = self._data[sb0 * self._sb:(sb1 + 1) * self._sb]
+                body = wheel_primes(self._origin + sb0 * self._sb, np.asarray(seg))
+            lo = r0 - int(self._cum[sb0])
+            parts.append(body[lo:lo + (r1 - r0)])
+        return parts[-1] if not parts[0].size else np.concatenate(parts)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._len)
+            return self.read(start, stop)[::step]
+        row = int(key)
+        if row < 0:
+            row += self._len
+        if not 0 <= row < self._len:
+            raise IndexError(row)
+        return self.read(row, row + 1)[0]
+
+    def select(self, i: int) -> int:
+        """Valeur du premier d'indice i (0-based) dans le magasin."""
+        return int(self[i])
+
+    def rank(self, x: int) -> int:
+        """Nombre de premiers stockés <= x."""
+        x = int(x)
+        count = int(np.searchsorted(self._head, x, side='right'))
+        b = x // WHEEL - self._origin
+        if x < 7 or b < 0:
+            return count
+        if b >= self._data.size:
+            return self._len
+        sb = min(b // self._sb, self._cum.size - 1)
+        count += int(self._cum[sb])
+        count += int(_POPCOUNT8[self._data[sb * self._sb:b]].sum(dtype=np.int64))
+        count += int(_POPCOUNT8[self._data[b] & _WHEEL_LE_MASK[x % WHEEL]])
+        return count
+
+    def contains(self, values) -> np.ndarray:
+        """Pour chaque valeur (uint64), vrai si elle figure dans le magasin (lecture d'un bit)."""
+        values = np.asarray(values, dtype=np.uint64)
+        out = np.isin(values, self._head)
+        b = (values // np.uint64(WHEEL)).astype(np.int64) - self._origin
+        r = (values % np.uint64(WHEEL)).astype(np.int64)
+        ok = np.flatnonzero((b >= 0) & (b < self._data.size) & np.isin(r, WHEEL_RESIDUES))
+        out[ok] = (self._data[b[ok]] >> _WHEEL_BITIDX[r[ok]]) & 1 == 1
+        return out
+
+    def searchsorted(self, x: int, side: str = "left") -> int:
+        """Comme np.searchsorted sur tout le magasin, pour une valeur : un rang."""
+        x = int(x)
+        if side == "left":
+            return self.rank(x - 1) if x > 0 else 0
+        return self.rank(x)
+
+
+def open_store(path: Path):
+    """Ouvre en lecture le magasin situé à path (format déduit de l'extension)."""
+    path = Path(path)
+    if path.suffix == ".gaps":
+        return GapStore(path)
+    if path.suffix == ".bits":
+        return BitmapStore(path)
+    return np.memmap(path, dtype=np.uint64, mode='r')
+
+
+def store_rows(store, count: int, rows: tuple = None, values: tuple = None) -> tuple:
+    """Lignes (start, stop) à lire parmi les count premières : rows=(i, j) comme une tranche
+    (i inclus, j exclu) ou values=(a, b), bornes incluses, résolu en O(log n) par recherche
+    dichotomique dans le magasin."""
+    count = min(int(count), len(store))
+    if values is not None:
+        def find(x, side):
+            if x < 0:
+                return 0
+            if x >= 1 << 64:
+                return count
+            if isinstance(store, np.ndarray):
+                return int(np.searchsorted(store[:count], np.uint64(x), side=side))
+            return min(store.searchsorted(x, side), count)
+        start, stop = find(int(values[0]), "left"), find(int(values[1]), "right")
+    elif rows is not None:
+        start, stop = int(rows[0]), int(rows[1])
+    else:
+        start, stop = 0, count
+    start = min(max(0, start), count)
+    return start, min(max(start, stop), count)
+
+
+def iter_store(path: Path, start: int = 0, stop: int = None, block: int = 10_000_000):
+    """Lignes [start, stop) du magasin, par tableaux uint64 d'au plus block valeurs : même
+    forme de flux que iter_primes, pour les consommateurs (export…)."""
+    mm = open_store(path)
+    stop = len(mm) if stop is None else min(int(stop), len(mm))
+    try:
+        for i in range(int(start), stop, block):
+            yield np.asarray(mm[i:min(i + block, stop)], dtype=np.uint64)
+    finally:
+        del mm
+
+
+# ---------- Test de primalité (lots) ----------
+# Miller–Rabin déterministe : bases suffisantes sous 4 759 123 141 (> 2^32) et sous 2^64
+MR_BASES_32 = (2, 7, 61)
+MR_BASES_64 = (2, 325, 9375, 28178, 450775, 9780504, 1795265022)
+_TRIAL_PRIMES = _SMALL_PRIMES.astype(np.uint64)
+_M32 = np.uint64(0xFFFFFFFF)
+_S32 = np.uint64(32)
+
+
+def _mulhi(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    # 64 bits de poids fort de a*b (produit 128 bits), par moitiés de 32 bits
+    a0, a1 = a & _M32, a >> _S32
+    b0, b1 = b & _M32, b >> _S32
+    p01, p10 = a0 * b1, a1 * b0
+    mid = ((a0 * b0) >> _S32) + (p01 & _M32) + (p10 & _M32)
+    return a1 * b1 + (p01 >> _S32) + (p10 >> _S32) + (mid >> _S32)
+
+
+def _mont_mul(a, b, n, ninv):
+    # Produit de Montgomery a*b/2^64 mod n (n impair, a, b < n) ; aucun dépassement :
+    # tout se calcule modulo 2^64, retenues comprises
+    lo = a * b
+    hi = _mulhi(a, b)
+    m = lo * ninv
+    mh = _mulhi(m, n)
+    s = hi + mh
+    carry = s < hi
+    s2 = s + (lo != 0).astype(np.uint64)  # lo + bas(m*n) = 2^64 exactement si lo != 0
+    carry |= s2 < s
+    return np.where(carry | (s2 >= n), s2 - n, s2)
+
+
+def _miller_rabin_64(n: np.ndarray) -> np.ndarray:
+    """n impairs > 1 (uint64) : vrai si premier, par Miller–Rabin déterministe sous 2^64
+    en arithmétique de Montgomery vectorisée."""
+    zero = np.uint64(0)
+    one_u = np.uint64(1)
+    ninv = n.copy()                     # -n^-1 mod 2^64 par Newton (3 -> 96 bits)
+    for _ in range(5):
+        ninv *= np.uint64(2) - n * ninv
+    ninv = zero - ninv
+    one = (zero - n) % n                # R mod n, R = 2^64
+    r2 = one.copy()                     # R² mod n par 64 doublements modulaires
+    for _ in range(64):
+        t = r2 + r2
+        r2 = np.where((t < r2) | (t >= n), t - n, t)
+    minus_one = n - one
+    d = n - one_u
+    s = np.log2((d & (zero - d)).astype(np.float64)).astype(np.int64)  # valuation 2-adique
+    d >>= s.astype(np.uint64)
+    n_bits = int(d.max()).bit_length()
+
+    alive = np.arange(n.size)
+    for base in MR_BASES_64:
+        if not alive.size:
+            break
+        nn, ni, o, mo = n[alive], ninv[alive], one[alive], minus_one[alive]
+        dd, ss = d[alive], s[alive]
+        a = np.uint64(base) % nn
+        skip = a == zero                # base multiple de n : témoin sans objet
+        a_m = _mont_mul(a, r2[alive], nn, ni)
+        x = o.copy()
+        for bit in range(n_bits - 1, -1, -1):
+            x = _mont_mul(x, x, nn, ni)
+            sel = ((dd >> np.uint64(bit)) & one_u) == one_u
+            x = np.where(sel, _mont_mul(x, a_m, nn, ni), x)
+        ok = skip | (x == o) | (x == mo)
+        for i in range(1, int(ss.max()) if ss.size else 0):
+            x = _mont_mul(x, x, nn, ni)
+            ok |= (i < ss) & (x == mo)
+        alive = alive[ok]
+    out = np.zeros(n.size, dtype=np.bool_)
+    out[alive] = True
+    return out
+
+
+def _miller_rabin_32(n: np.ndarray) -> np.ndarray:
+    # n impairs < 2^32 : les produits tiennent dans un uint64, pas besoin de Montgomery
+    d = n - np.uint64(1)
+    s = np.zeros(n.size, dtype=np.int64)
+    while True:
+        even = (d & np.uint64(1)) == 0
+        if not even.any():
+            break
+        d = np.where(even, d >> np.uint64(1), d)
+        s += even
+    alive = np.arange(n.size)
+    for base in MR_BASES_32:
+        nn, dd, ss = n[alive], d[alive], s[alive]
+        a = np.uint64(base) % nn
+        x = np.ones(nn.size, dtype=np.uint64)
+        p = a.copy()
+        e = dd.copy()
+        while e.any():
+            x = np.where((e & np.uint64(1)) == 1, x * p % nn, x)
+            p = p * p % nn
+            e >>= np.uint64(1)
+        mo = nn - np.uint64(1)
+        ok = (a == 0) | (x == 1) | (x == mo)
+        for i in range(1, int(ss.max()) if ss.size else 0):
+            x = x * x % nn
+            ok |= (i < ss) & (x == mo)
+        alive = alive[ok]
+    out = np.zeros(n.size, dtype=np.bool_)
+    out[alive] = True
+    return out
+
+
+def is_prime(values, store_path: Path = None, chunk: int = 1 << 18) -> np.ndarray:
+    """Primalité de chaque valeur d'un tableau (convertie en uint64), sous forme de tableau
+    bool de même forme. Avec store_path, les valeurs de la plage entièrement couverte par
+    le magasin (d'après ses métadonnées) y sont cherchées ; les autres passent par une
+    division d'essai puis Miller–Rabin déterministe (bases 32 ou 64 bits)."""
+    values = np.asarray(values, dtype=np.uint64)
+    flat = values.ravel()
+    out = np.zeros(flat.size, dtype=np.bool_)
+    todo = np.ones(flat.size, dtype=np.bool_)
+
+    meta = read_store_meta(store_path) if store_path is not None else None
+    if meta is not None and meta["count"]:
+        lo = meta["range"][0] if meta["range"] is not None else 0
+        # Couverture [lo, current - 1] : current vaut 2^64 pour un intervalle achevé à 2^64 - 1
+        hi = min(int(meta["current"]), 1 << 64) - 1
+        covered = np.flatnonzero((flat >= np.uint64(lo)) & (flat <= np.uint64(hi)))
+        store = open_store(store_path)
+        if isinstance(store, np.memmap):
+            primes = store[:meta["count"]]
+            pos = np.minimum(np.searchsorted(primes, flat[covered]), primes.size - 1)
+            out[covered] = primes[pos] == flat[covered]
+        else:
+            out[covered] = store.contains(flat[covered])
+        todo[covered] = False
+        del store
+
+    # Division d'essai par les premiers < 49 : élimine l'essentiel des composés
+    rest = np.flatnonzero(todo)
+    for lo in range(0, rest.size, chunk):
+        idx = rest[lo:lo + chunk]
+        v = flat[idx]
+        small = v < np.uint64(49 * 49)
+        cand = v > np.uint64(1)
+        for p in _TRIAL_PRIMES:
+            cand &= (v % p != 0) | (v == p)
+        # Sous 49² = 2401, passer la division d'essai suffit
+        out[idx[cand & small]] = True
+        big = idx[cand & ~small]
+        v = flat[big]
+        narrow = v < np.uint64(1 << 32)
+        if narrow.any():
+            out[big[narrow]] = _miller_rabin_32(v[narrow])
+        if not narrow.all():
+            out[big[~narrow]] = _miller_rabin_64(v[~narrow])
+    return out.reshape(values.shape)
+
+
+# ---------- Statistiques en flux ----------
+def exact_sum(primes: np.ndarray) -> int:
+    """Somme exacte (entier Python) d'un bloc uint64 : moitiés hautes et basses de 32 bits
+    sommées à part en uint64 (aucune retenue perdue sous 2^32 valeurs), puis recombinées."""
+    words = np.ascontiguousarray(primes, dtype='<u8').view('<u4')   # (bas, haut) par valeur
+    lo = np.add.reduce(words[0::2], dtype=np.uint64)
+    hi = np.add.reduce(words[1::2], dtype=np.uint64)
+    return (int(hi) << 32) + int(lo)
+
+
+def _add_counts(acc: np.ndarray, counts: np.ndarray) -> np.ndarray:
+    if counts.size > acc.size:
+        acc = np.concatenate([acc, np.zeros(counts.size - acc.size, dtype=np.int64)])
+    acc[:counts.size] += counts
+    return acc
+
+
+# Une statistique reçoit chaque bloc de premiers écrit, ses écarts avec le premier précédent
+# (gaps[i] = primes[i] - p_(row0 + i - 1), écart de bord compris, int64) et row0, indice dans
+# le magasin du premier qui ferme gaps[0]. state()/load() passent par les métadonnées : une
+# reprise ou une extension poursuit les comptes sans relire le magasin.
+class GapHistogram:
+    """Nombre d'occurrences de chaque écart entre premiers consécutifs."""
+
+    def __init__(self, cfg: GenConfig = None):
+        self.counts = np.zeros(0, dtype=np.int64)
+
+    def update(self, primes, gaps, row0):
+        self.counts = _add_counts(self.counts, np.bincount(gaps))
+
+    def state(self):
+        return self.counts.tolist()
+
+    def load(self, state):
+        self.counts = np.array(state, dtype=np.int64)
+
+    def report(self) -> dict:
+        gaps = np.flatnonzero(self.counts)
+        return dict(zip(gaps.tolist(), self.counts[gaps].tolist()))
+
+
+class RecordGaps:
+    """Écarts maximaux : chaque écart plus grand que tous les précédents, avec le premier
+    qui l'ouvre et l'indice de ce premier, (écart, p, ligne)."""
+
+    def __init__(self, cfg: GenConfig = None):
+        self.records = []
+
+    def update(self, primes, gaps, row0):
+        best = self.records[-1][0] if self.records else 0
+        if not gaps.size or int(gaps.max()) <= best:
+            return   # cas courant : aucun record dans le bloc
+        bar = np.empty_like(gaps)
+        bar[0] = best
+        np.maximum(np.maximum.accumulate(gaps[:-1]), best, out=bar[1:])
+        shift = primes.size - gaps.size   # 1 si le bloc ouvre le magasin
+        for i in np.flatnonzero(gaps > bar).tolist():
+            gap = int(gaps[i])
+            self.records.append((gap, int(primes[shift + i]) - gap, row0 + i - 1))
+
+    def state(self):
+        return [list(r) for r in self.records]
+
+    def load(self, state):
+        self.records = [tuple(r) for r in state]
+
+    def report(self) -> list:
+        return list(self.records)
+
+
+class ResidueCounts:
+    """Nombre de premiers par résidu modulo k (GenConfig.residue_modulus)."""
+
+    def __init__(self, cfg: GenConfig = None):
+        self.modulus = int(cfg.residue_modulus) if cfg is not None else 30
+        self.counts = np.zeros(self.modulus, dtype=np.int64)
+
+    def update(self, primes, gaps, row0):
+        residues = (primes % np.uint64(self.modulus)).view(np.int64)
+        self.counts += np.bincount(residues, minlength=self.modulus)
+
+    def state(self):
+        return {"modulus": self.modulus, "counts": self.counts.tolist()}
+
+    def load(self, state):
+        if state["modulus"] != self.modulus:
+            raise ValueError("modulo différent")
+        self.counts = np.array(state["counts"], dtype=np.int64)
+
+    def report(self) -> dict:
+        return {"modulus": self.modulus, "counts": self.counts.tolist()}
+
+
+class TwinCount:
+    """Nombre de paires de premiers jumeaux (p, p + 2)."""
+
+    def __init__(self, cfg: GenConfig = None):
+        self.count = 0
+
+    def update(self, primes, gaps, row0):
+        self.count += int(np.count_nonzero(gaps == 2))
+
+    def state(self):
+        return self.count
+
+    def load(self, state):
+        self.count = int(state)
+
+    def report(self) -> int:
+        return self.count
+
+
+# Pyramide d'agrégats (fichier .pyr à côté du magasin). Niveau 0 : seaux de largeur W en
+# valeur (puissance de 2) à partir de origin ; niveau k : seaux de largeur W·2^k. Par seau :
+# nombre de premiers et écarts min / max / somme (un écart compte dans le seau du premier qui
+# le ferme). Un graphique lit O(pixels) seaux au niveau adapté au zoom, jamais le magasin.
+PYRAMID_BUCKETS = 1 << 20   # seaux visés au niveau 0 ; au-delà de 2x, le niveau 0 est abandonné
+PYRAMID_MIN_PRIMES = 64     # premiers par seau au minimum (en moyenne) : le coût reste par premier
+_PYR_DTYPE = np.dtype([
+    ('count', '<u8'),
+    ('gsum', '<u8'),
+    ('gmin', '<u4'),    # 0xFFFFFFFF : aucun écart dans le seau
+    ('gmax', '<u4'),
+])
+_PYR_HEADER_DTYPE = np.dtype([
+    ('origin', '<u8'),
+    ('width', '<u8'),
+    ('row0', '<u8'),    # lignes du magasin avant le premier premier compté
+    ('rows', '<u8'),    # row0 + premiers comptés
+    ('levels', '<u8'),
+    ('last', '<u8'),    # plus grand premier compté
+])
+
+
+def _empty_buckets(n: int) -> np.ndarray:
+    out = np.zeros(n, dtype=_PYR_DTYPE)
+    out['gmin'] = 0xFFFFFFFF
+    return out
+
+
+def _merge_buckets(child: np.ndarray) -> np.ndarray:
+    # Seaux parents : paires consécutives de child (la dernière éventuellement seule)
+    if child.size % 2:
+        child = np.concatenate([child, _empty_buckets(1)])
+    pairs = child.reshape(-1, 2)
+    out = np.empty(pairs.shape[0], dtype=_PYR_DTYPE)
+    out['count'] = pairs['count'].sum(axis=1)
+    out['gsum'] = pairs['gsum'].sum(axis=1)
+    out['gmin'] = pairs['gmin'].min(axis=1)
+    out['gmax'] = pairs['gmax'].max(axis=1)
+    return out
+
+
+class GapPyramid:
+    """Pyramide d'agrégats : update() bloc par bloc pendant la génération, save() vers le
+    fichier .pyr, open() pour le relire (memmap) et buckets() pour un graphique."""
+
+    def __init__(self, width: int, origin: int = None, row0: int = 0):
+        self.width = 1 << max(0, int(width) - 1).bit_length()
+        self.origin = origin
+        self.row0 = self.rows = int(row0)
+        self.last = None
+        self.levels = [_empty_buckets(0)]
+        self.sizes = [0]
+
+    @staticmethod
+    def width_for(span: float, count: float) -> int:
+        """Largeur de seau du niveau 0 pour count premiers répartis sur span entiers : au plus
+        ~PYRAMID_BUCKETS seaux, d'au moins ~PYRAMID_MIN_PRIMES premiers."""
+        span = max(1.0, span)
+        target = max(span / PYRAMID_BUCKETS, span * PYRAMID_MIN_PRIMES / max(1.0, count), 1.0)
+        return 1 << math.ceil(math.log2(target))
+
+    @classmethod
+    def open(cls, path: Path, in_memory: bool = False):
+        """Pyramide enregistrée à path : niveaux en memmap (lecture seule) ou copiés en mémoire
+        (pour la prolonger, ou sans garder le fichier ouvert pendant qu'il est réécrit)."""
+        path = Path(path)
+        header = np.fromfile(path, dtype=_PYR_HEADER_DTYPE, count=1)[0]
+        n_levels = int(header['levels'])
+        sizes = np.fromfile(path, dtype='<u8', count=n_levels, offset=_PYR_HEADER_DTYPE.itemsize).tolist()
+        pyr = cls(int(header['width']), int(header['origin']), int(header['row0']))
+        pyr.rows = int(header['rows'])
+        pyr.last = int(header['last']) or None
+        offset = _PYR_HEADER_DTYPE.itemsize + 8 * n_levels
+        data = np.memmap(path, dtype=np.uint8, mode='r')
+        pyr.levels, pyr.sizes = [], []
+        for n in sizes:
+            level = data[offset:offset + n * _PYR_DTYPE.itemsize].view(_PYR_DTYPE)
+            pyr.levels.append(np.array(level) if in_memory else level)
+            pyr.sizes.append(n)
+            offset += n * _PYR_DTYPE.itemsize
+        if not sizes:
+            pyr.levels, pyr.sizes = [_empty_buckets(0)], [0]
+        return pyr
+
+    def save(self, path: Path):
+        # Écriture atomique, comme les métadonnées
+        path = Path(path)
+        header = np.array([(self.origin or 0, self.width, self.row0, self.rows, len(self.levels),
+                            self.last or 0)],
+                          dtype=_PYR_HEADER_DTYPE)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(header.tobytes())
+            f.write(np.array(self.sizes, dtype='<u8').tobytes())
+            for level, n in zip(self.levels, self.sizes):
+                f.write(level[:n].tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def _level(self, k: int, n: int) -> np.ndarray:
+        # Niveau k d'au moins n seaux (les nouveaux sont vides)
+        while len(self.levels) <= k:
+            self.levels.append(_empty_buckets(0))
+            self.sizes.append(0)
+        level = self.levels[k]
+        if n > level.size:
+            grown = _empty_buckets(max(n, 2 * level.size, 64))
+            grown[:self.sizes[k]] = level[:self.sizes[k]]
+            self.levels[k] = level = grown
+        self.sizes[k] = max(self.sizes[k], n)
+        return level
+
+    def update(self, primes: np.ndarray, gaps: np.ndarray):
+        """Ajoute un bloc croissant ; gaps : écarts de ses derniers premiers (cf. PrimeStats)."""
+        if not primes.size:
+            return
+        if self.origin is None:
+            self.origin = int(primes[0]) - int(primes[0]) % self.width
+        # Bornes des seaux cherchées dans le bloc (searchsorted) : O(seaux · log), sans
+        # calculer le seau de chaque premier
+        shift = self.width.bit_length() - 1
+        first = (int(primes[0]) - self.origin) >> shift
+        last = (int(primes[-1]) - self.origin) >> shift
+        edges = np.uint64(self.origin) + (np.arange(first + 1, last + 1, dtype=np.uint64) << np.uint64(shift))
+        bounds = np.concatenate([[0], np.searchsorted(primes, edges), [primes.size]])
+        base = self._level(0, last + 1)
+        base['count'][first:last + 1] += np.diff(bounds).astype(np.uint64)
+        if gaps.size:
+            bounds = np.clip(bounds - (primes.size - gaps.size), 0, gaps.size)
+            filled = np.flatnonzero(np.diff(bounds))
+            starts, ids = bounds[filled], first + filled
+            g = gaps.view(np.uint64)
+            base['gsum'][ids] += np.add.reduceat(g, starts)
+            base['gmin'][ids] = np.minimum(base['gmin'][ids], np.minimum.reduceat(g, starts))
+            base['gmax'][ids] = np.maximum(base['gmax'][ids], np.maximum.reduceat(g, starts))
+        self.rows += int(primes.size)
+        self.last = int(primes[-1])
+        # Seaux parents recalculés à partir du premier seau touché : O(nouveaux seaux)
+        k = 0
+        while self.sizes[k] > 1:
+            lo, hi = first // 2, (self.sizes[k] + 1) // 2
+            parents = _merge_buckets(self.levels[k][2 * lo:self.sizes[k]])
+            self._level(k + 1, hi)[lo:hi] = parents
+            first, k = lo, k + 1
+        if self.sizes[0] > 2 * PYRAMID_BUCKETS:
+            # Magasin prolongé bien au-delà de l'estimation : le niveau 0 disparaît, W double
+            del self.levels[0], self.sizes[0]
+            self.width *= 2
+
+    def _prefix_count(self, k: int, i: int) -> int:
+        # Premiers des seaux [0, i) du niveau k, en O(niveaux)
+        total = 0
+        while i > 0:
+            if i % 2:
+                total += int(self.levels[k][i - 1]['count'])
+                i -= 1
+            if k + 1 >= len(self.levels):
+                total += int(self.levels[k][:i]['count'].sum())
+                break
+            i, k = i // 2, k + 1
+        return total
+
+    def extent(self) -> tuple:
+        """Intervalle de valeurs couvert [x0, x1)."""
+        return self.origin or 0, (self.origin or 0) + self.sizes[0] * self.width
+
+    def buckets(self, x0: float, x1: float, pixels: int) -> dict:
+        """Seaux du niveau le plus fin qui couvre [x0, x1) en au plus ~pixels seaux :
+        x (bord gauche), x_end (bord droit, borné au dernier premier compté + 1), width,
+        count, gmin, gmax, gsum et pi (nombre de lignes du magasin jusqu'à la fin du seau).
+        O(pixels + niveaux)."""
+        lo, hi = self.extent()
+        x0, x1 = max(float(x0), lo), min(float(x1), hi)
+        k = 0
+        while k + 1 < len(self.levels) and (x1 - x0) / (self.width << k) > max(1, pixels):
+            k += 1
+        w = self.width << k
+        i0 = max(0, int((x0 - lo) // w))
+        i1 = min(self.sizes[k], max(i0, int(math.ceil((x1 - lo) / w))))
+        recs = self.levels[k][i0:i1]
+        count = recs['count'].astype(np.int64)
+        return {
+            "x": lo + np.arange(i0, i1, dtype=np.float64) * w,
+            "x_end": np.minimum(lo + np.arange(i0 + 1, i1 + 1, dtype=np.float64) * w,
+                                 hi if self.last is None else self.last + 1.0),
+            "width": w,
+            "count": count,
+            "gmin": recs['gmin'],
+            "gmax": recs['gmax'],
+            "gsum": recs['gsum'],
+            "pi": self.row0 + self._prefix_count(k, i0) + np.cumsum(count),
+        }
+
+
+class PyramidStats:
+    """Statistique « pyramid » : GapPyramid du magasin, enregistrée à côté de lui (.pyr) à
+    chaque point de reprise ; le rapport donne son chemin."""
+
+    def __init__(self, cfg: GenConfig = None):
+        self.path = pyramid_path(cfg.tmp_dir / cfg.mmap_filename)
+        if cfg.prime_range is not None:
+            a, b = cfg.prime_range
+            span, count = b - a, riemann_r(b) - riemann_r(max(a - 1, 0))
+        else:
+            span, count = inverse_riemann_r(cfg.count) * 1.05, cfg.count
+        self.pyramid = GapPyramid(GapPyramid.width_for(span, count))
+
+    def update(self, primes, gaps, row0):
+        if self.pyramid.origin is None:
+            self.pyramid.row0 = self.pyramid.rows = row0 - (primes.size - gaps.size)
+        self.pyramid.update(primes, gaps)
+
+    def state(self):
+        self.pyramid.save(self.path)
+        return {"rows": self.pyramid.rows}
+
+    def load(self, state):
+        pyramid = GapPyramid.open(self.path, in_memory=True)
+        if pyramid.rows != state["rows"]:
+            raise ValueError("pyramide désynchronisée")
+        self.pyramid = pyramid
+
+    def report(self) -> str:
+        return str(self.path)
+
+
+STATS = {
+    "gaps": GapHistogram,
+    "records": RecordGaps,
+    "residues": ResidueCounts,
+    "twins": TwinCount,
+    "pyramid": PyramidStats,
+}
+
+
+class PrimeStats:
+    """Étage de statistiques de la génération : les statistiques cfg.stats (clés de STATS)
+    sont mises à jour sur chaque bloc écrit, sans seconde passe sur le magasin. Elles
+    couvrent les lignes [first_row, rows) : first_row vaut 0, sauf extension d'un magasin
+    dont l'état n'a pas été enregistré."""
+
+    def __init__(self, cfg: GenConfig, rows: int = 0, last: int = None, state: dict = None):
+        self.cfg = cfg
+        self.stages = {name: STATS[name](cfg) for name in cfg.stats}
+        self.first_row = self.rows = int(rows)
+        self.last = last    # dernier premier vu : écart de bord du bloc suivant
+        if rows and state is not None:
+            try:
+                self._load(state)
+            except (KeyError, TypeError, ValueError):
+                self.stages = {name: STATS[name](cfg) for name in cfg.stats}
+                self.first_row = self.rows
+
+    def _load(self, state: dict):
+        # Les étapes demandées doivent toutes figurer dans l'état ; les autres sont abandonnées
+        if state["rows"] != self.rows or not set(self.stages) <= set(state["stages"]):
+            raise ValueError("état incompatible")
+        for name, stage in self.stages.items():
+            stage.load(state["stages"][name])
+        self.first_row = int(state["first_row"])
+
+    def update(self, primes: np.ndarray):
+        if not primes.size:
+            return
+        if self.last is None:
+            gaps, row0 = np.subtract(primes[1:], primes[:-1]), self.rows + 1
+        else:
+            gaps, row0 = np.empty_like(primes), self.rows
+            gaps[0] = primes[0] - np.uint64(self.last)
+            np.subtract(primes[1:], primes[:-1], out=gaps[1:])
+        gaps = gaps.view(np.int64)
+        for stage in self.stages.values():
+            stage.update(primes, gaps, row0)
+        self.rows += int(primes.size)
+        self.last = int(primes[-1])
+
+    def state(self) -> dict:
+        return {"rows": self.rows, "first_row": self.first_row,
+                "stages": {name: stage.state() for name, stage in self.stages.items()}}
+
+    def report(self) -> dict:
+        out = {name: stage.report() for name, stage in self.stages.items()}
+        out["rows"] = (self.first_row, self.rows)
+        return out
+
+
+# ---------- Réglage automatique ----------
+# La taille de segment optimale dépend des caches de la machine plus que de N : un segment
+# qui tient en L2 est relu sans défaut de cache par chaque tranche, un segment plus grand
+# amortit mieux le coût Python par premier de base. calibrate_segment_size() mesure les
+# candidats autour de L2 sur un crible court ; le gagnant est enregistré par hôte
+# (tuning_path()) et repris par tuned_settings().
+CALIBRATION_HEIGHT = 10 ** 10   # hauteur du crible de calibrage (ordre de p_n pour N ~ 5·10^8)
+CALIBRATION_ROUNDS = 2          # passes par candidat, meilleur temps gardé
+MAX_SEGMENT = 1 << 22
+
+
+def _parse_cache_size(text: str) -> int:
+    # « 48K », « 2048K », « 32M » (format de /sys/devices/system/cpu/…/cache/index*/size)
+    text = text.strip().upper()
+    unit = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}.get(text[-1:], 1)
+    return int(text.rstrip("KMG")) * unit
+
+
+def cache_topology(cpu: int = 0) -> dict:
+    """Caches de données du cœur cpu, {niveau: octets}, lus dans /sys (Linux) ; vide ailleurs."""
+    caches = {}
+    for entry in sorted(Path(f"/sys/devices/system/cpu/cpu{cpu}/cache").glob("index*")):
+        try:
+            kind = (entry / "type").read_text().strip()
+            if kind in ("Data", "Unified"):
+                caches[int((entry / "level").read_text())] = _parse_cache_size((entry / "size").read_text())
+        except (OSError, ValueError):
+            continue
+    return caches
+
+
+def segment_candidates(caches: dict) -> list:
+    """Tailles de segment (puissances de 2) à mesurer : de L2/8 à 4·L2 (sans dépasser L3),
+    bornées à [2^16, MAX_SEGMENT] ; sans topologie connue, 2^18 à MAX_SEGMENT."""
+    l2 = caches.get(2)
+    if not l2:
+        return [1 << k for k in range(18, MAX_SEGMENT.bit_length())]
+    l2 = 1 << (l2.bit_length() - 1)
+    hi = min(4 * l2, max(caches.get(3, 0), l2), MAX_SEGMENT)
+    lo = min(max(l2 // 8, 1 << 16), hi)
+    return [1 << k for k in range(lo.bit_length() - 1, hi.bit_length())]
+
+
+def calibrate_segment_size(candidates: list = None, on_progress=None, should_stop=None):
+    """Crible court (max(candidats) octets de roue à CALIBRATION_HEIGHT) pour chaque taille :
+    renvoie le réglage de l'hôte (segment_size, temps par octet de chaque candidat, durée d'un
+    segment) à passer à save_tuning(). on_progress(fait, total) après chaque mesure ;
+    should_stop() est consulté à chaque segment, et un calibrage interrompu renvoie None."""
+    caches = cache_topology()
+    candidates = sorted(candidates or segment_candidates(caches))
+    span = max(candidates)
+    k0 = CALIBRATION_HEIGHT // WHEEL
+    base = primes_up_to(math.isqrt(WHEEL * (k0 + span)) + 1)[1:]
+    best = {seg: float("inf") for seg in candidates}
+    steps = CALIBRATION_ROUNDS * len(candidates)
+    for step in range(steps):
+        # Passes entrelacées : une perturbation passagère ne pénalise pas un seul candidat
+        seg = candidates[step % len(candidates)]
+        t0 = time.perf_counter()
+        sieve = WheelSieve(base, k0, seg, k0 + span)
+        for k in range(k0, k0 + span, seg):
+            if should_stop is not None and should_stop():
+                return None
+            wheel_primes(k, sieve.sieve(k, k + seg))
+        best[seg] = min(best[seg], time.perf_counter() - t0)
+        if on_progress is not None:
+            on_progress(step + 1, steps)
+    winner = min(candidates, key=lambda seg: best[seg])
+    return {
+        "host": platform.node(),
+        "caches": {str(level): size for level, size in sorted(caches.items())},
+        "segment_size": winner,
+        "segment_ms": 1e3 * best[winner] * winner / span,
+        "ns_per_byte": {str(seg): 1e9 * t / span for seg, t in best.items()},
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def tuning_path() -> Path:
+    """Fichier des réglages par hôte : NB_PREMIER_TUNING, sinon dossier de configuration
+    de l'utilisateur (APPDATA, XDG_CONFIG_HOME ou ~/.config)/nb_premier/tuning.json."""
+    override = os.environ.get("NB_PREMIER_TUNING")
+    if override:
+        return Path(override)
+    root = os.environ.get("APPDATA") or os.environ.get("XDG_CONFIG_HOME") or Path.home() / ".config"
+    return Path(root) / "nb_premier" / "tuning.json"
+
+
+def _read_tunings(path: Path) -> dict:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def load_tuning(path: Path = None):
+    """Réglage enregistré pour cet hôte, ou None (absent, illisible, ou caches différents :
+    machine changée sous le même nom)."""
+    entry = _read_tunings(Path(path or tuning_path())).get(platform.node())
+    if not isinstance(entry, dict) or "segment_size" not in entry:
+        return None
+    current = {str(level): size for level, size in sorted(cache_topology().items())}
+    if entry.get("caches") != current:
+        return None
+    return entry
+
+
+def save_tuning(tuning: dict, path: Path = None):
+    """Enregistre le réglage de l'hôte (les autres hôtes du fichier sont conservés)."""
+    path = Path(path or tuning_path())
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = _read_tunings(path)
+    data[tuning["host"]] = tuning
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def auto_tune(force: bool = False, on_progress=None, should_stop=None):
+    """Réglage de l'hôte : celui enregistré, sinon (ou avec force) calibré puis enregistré.
+    None si should_stop() a interrompu le calibrage (rien n'est enregistré)."""
+    tuning = None if force else load_tuning()
+    if tuning is None:
+        tuning = calibrate_segment_size(on_progress=on_progress, should_stop=should_stop)
+        if tuning is None:
+            return None
+        try:
+            save_tuning(tuning)
+        except OSError:
+            pass   # dossier de configuration non inscriptible : réglage valable pour ce run
+    return tuning
+
+
+# ---------- Génération ----------
+def tuned_settings(total: int, tuning: dict = None) -> dict:
+    """Réglages de GenConfig adaptés à la taille du travail (nombre de premiers attendus).
+    segment_size vient du calibrage de l'hôte s'il existe (tuning, sinon load_tuning()),
+    à défaut d'une échelle selon N."""
+    if total >= 1_000_000_000:
+        segment_size, update_interval = 1 << 21, 125
+    elif total >= 100_000_000:
+        segment_size, update_interval = 1 << 20, 90
+    elif total >= 10_000_000:
+        segment_size, update_interval = 1 << 19, 60
+    else:
+        segment_size, update_interval = 1 << 18, 40
+    tuning = tuning or load_tuning()
+    if tuning is not None:
+        segment_size = int(tuning["segment_size"])
+        # Progression au plus une fois par segment calibré (un intervalle plus court n'apporte
+        # que des signaux sans nouvelle ligne), dans la limite de 125 ms pour l'interface
+        update_interval = max(update_interval, min(125, int(math.ceil(tuning.get("segment_ms", 0)))))
+    return dict(
+        segment_size=segment_size,
+        update_interval_ms=update_interval,
+        # Pool de processus seulement quand le démarrage des workers est amorti
+        workers=(os.cpu_count() or 1) if total >= 10_000_000 else 1,
+        # Au-delà de 100M, magasin à écarts (~1 octet/premier au lieu de 8)
+        store_format="gaps" if total >= 100_000_000 else "uint64",
+    )
+
+
+class GenerationError(Exception):
+    """Échec de génération dont le message s'adresse directement à l'utilisateur."""
+
+
+class PrimeGenerator:
+    """Génération des premiers dans un magasin, sans Qt. La progression et les étapes
+    remontent par des callbacks simples, on_progress(found, total) (au plus une fois par
+    update_interval_ms, précédé de on_rows(lignes lisibles dans le magasin), qui permet
+    à un lecteur d'ajouter les nouvelles lignes sans rouvrir le magasin) et on_status(message) ;
+    stop() peut être appelé depuis un autre thread. run() renvoie (n_found, pmax, sum, avg,
+    stats), sum exacte et stats = PrimeStats.report(), ou lève GenerationError. Les temps par
+    phase sont dans self.profile (Profiler) ; cfg.trace_file reçoit la trace en fin de run."""
+
+    def __init__(self, cfg: GenConfig, on_progress=None, on_status=None, on_rows=None):
+        self.cfg = cfg
+        self.on_progress = on_progress or (lambda found, total: None)
+        self.on_status = on_status or (lambda message: None)
+        self.on_rows = on_rows or (lambda rows: None)
+        self._stop = False
+        self._found = 0
+        self._rows = 0
+        self._target = cfg.count
+        self._last_update_ms = 0
+        self.profile = Profiler(cfg.profile, trace=cfg.trace_file is not None)
+
+    def stop(self):
+        self._stop = True
+
+    @staticmethod
+    def _safe_remove(path: Path, retries: int = 3):
+        for _ in range(retries):
+            try:
+                if path.exists():
+                    path.unlink()
+                return True
+            except Exception:
+                time.sleep(0.05)
+        return not path.exists()
+
+    def _emit_progress_if_needed(self):
+        now_ms = int(time.time() * 1000)
+        if now_ms - self._last_update_ms >= self.cfg.update_interval_ms:
+            # Relais Qt compris : temps des signaux émis depuis le thread de génération
+            with self.profile.phase("callbacks"):
+                self.on_rows(self._rows)
+                self.on_progress(self._found, self._target)
+            self._last_update_ms = now_ms
+
+    def _checkpoint(self, mm, mmap_path: Path, pmax: int, total_sum, target: int, current: int = None,
+                    count: int = None, stats: bool = True):
+        # Données synchronisées d'abord, métadonnées ensuite : le magasin contient toujours
+        # au moins les lignes annoncées (une reprise tronque l'excédent éventuel)
+        with self.profile.phase("checkpoint"):
+            mm.flush()
+            rng = self.cfg.prime_range
+            if current is None:
+                current = max(pmax + 1, int(rng[0])) if rng is not None else pmax + 1
+            write_store_meta(mmap_path, self.cfg.store_format, mm.count if count is None else count, pmax,
+                             int(total_sum), target, current, rng, self.stats.state() if stats else None)
+        self._last_checkpoint = time.monotonic()
+
+    def _ensure_disk_space(self, n_bytes: int, target_dir: Path):
+        required = n_bytes + (16 << 20)
+        try:
+            usage = shutil.disk_usage(str(target_dir))
+            if usage.free < required:
+                return False, required, usage.free
+        except Exception:
+            return True, required, None
+        return True, required, usage.free
+
+    def run(self) -> tuple:
+        try:
+            rng = self.cfg.prime_range
+            if rng is not None:
+                # Mode intervalle : tous les premiers de [a, b], sans limite de nombre
+                a, b = int(rng[0]), int(rng[1])
+                if not 0 <= a <= b < 1 << 64:
+                    raise GenerationError("Intervalle invalide : 0 <= a <= b < 2^64 requis.")
+                rng = (a, b)
+                n, target = sys.maxsize, None
+            else:
+                n = target = int(self.cfg.count)
+                if n <= 0:
+                    raise GenerationError("Le nombre demandé doit être > 0.")
+
+            fmt = self.cfg.store_format
+            mmap_path = self.cfg.tmp_dir / self.cfg.mmap_filename
+            if not acquire_store_lock(mmap_path):
+                raise GenerationError(f"Magasin en cours d'écriture par un autre processus : {mmap_path}")
+            locked = mmap_path
+            start = 0
+            current = rng[0] if rng is not None else 2
+            if self.cfg.extend:
+                # Extension d'un magasin existant ou reprise d'une génération interrompue :
+                # on repart du dernier point de reprise (count, pmax, sum, current)
+                meta = read_store_meta(mmap_path)
+                if meta is None or meta["format"] != fmt or meta["range"] != rng or \
+                        not mmap_path.exists():
+                    raise GenerationError(f"Magasin existant absent ou incompatible : {mmap_path}")
+                start = int(meta["count"])
+                if start > n:
+                    # Jamais de troncature : pmax, somme et statistiques décrivent toutes les lignes
+                    raise GenerationError(
+                        f"Le magasin contient déjà {start} premiers, plus que les {n} demandés : "
+                        f"rien à prolonger ({mmap_path}).")
+                current = int(meta["current"])
+
+            if rng is not None:
+                # Nombre attendu ≈ R(b) - R(a) : taille initiale du memmap et place disque
+                ub = rng[1]
+                lo = max(current - 1, 0)
+                expected = int(max(0.0, riemann_r(ub) - riemann_r(lo)) * 1.01) + 1024
+                self._target = start + expected
+            else:
+                # Borne certifiée p_n <= ub (π exact) : ni dépassement, ni marge arbitraire
+                self.on_status("Calcul de la borne supérieure…")
+                with self.profile.phase("bound"):
+                    ub = upper_bound_nth_prime(n)
+                lo = int(meta["pmax"]) if start else 0
+                expected = n - start
+
+            writer_cls = STORE_FORMATS[fmt][1]
+            ok_space, need_bytes, free_bytes = self._ensure_disk_space(
+                writer_cls.disk_bytes(expected, lo, max(lo, ub)), self.cfg.tmp_dir
+            )
+            if not ok_space:
+                need_gb = need_bytes / (1 << 30)
+                free_gb = (free_bytes or 0) / (1 << 30)
+                raise GenerationError(
+                    f"Espace disque insuffisant dans {self.cfg.tmp_dir}.\n"
+                    f"Requis ≈ {need_gb:.2f} Gio, libre ≈ {free_gb:.2f} Gio."
+                )
+
+            capacity = n if rng is None else self._target
+            store_bytes = _files_size(mmap_path) if start else 0
+            with self.profile.phase("open_store"):
+                if start:
+                    mm = create_store(mmap_path, fmt, capacity, start)
+                    self._found = start
+                    total_sum = int(meta["sum"])
+                    pmax = int(meta["pmax"])
+                    self.stats = PrimeStats(self.cfg, start, pmax, meta["stats"])
+                    pyr = pyramid_path(mmap_path)
+                    if "pyramid" not in self.stats.stages and pyr.exists() and not self._safe_remove(pyr):
+                        # Pyramide non prolongée : elle ne décrirait plus qu'une partie du magasin
+                        raise GenerationError(f"Impossible de supprimer : {pyr}")
+                else:
+                    for path in store_files(mmap_path):
+                        if path.exists() and not self._safe_remove(path):
+                            raise GenerationError(f"Impossible de supprimer : {path}")
+                    mm = create_store(mmap_path, fmt, capacity)
+                    self._found = 0
+                    total_sum = 0
+                    pmax = 0
+                    self.stats = PrimeStats(self.cfg)
+            self._rows = mm.readable
+            prof = self.profile
+
+            # Seuls les premiers >= current manquent : le magasin consomme le flux de iter_primes
+            # et ne garde que la somme et le dernier premier de chaque bloc
+            stream = iter_primes(current, ub, n - self._found, max(1, int(self.cfg.segment_size)),
+                                 max(1, int(self.cfg.workers)), on_status=self.on_status,
+                                 profiler=prof)
+            self._emit_progress_if_needed()
+            self._last_checkpoint = time.monotonic()
+            done, clean = (self._found, pmax, total_sum), True   # dernier bloc entièrement traité
+            try:
+                for primes in stream:
+                    clean = False
+                    with prof.phase("store_write"):
+                        mm.append(primes)
+                    self._found, self._rows = mm.count, mm.readable
+                    with prof.phase("sum"):
+                        total_sum += exact_sum(primes)   # dépasse 2^64 vers 1,5 milliard de premiers
+                    with prof.phase("stats"):
+                        self.stats.update(primes)
+                    prof.count("blocks")
+                    prof.count("primes", primes.size)
+                    pmax = int(primes[-1])
+                    done, clean = (self._found, pmax, total_sum), True
+                    self._emit_progress_if_needed()
+                    if self._stop:
+                        break
+                    if time.monotonic() - self._last_checkpoint >= self.cfg.checkpoint_interval_s:
+                        self._checkpoint(mm, mmap_path, pmax, total_sum, target)
+                else:
+                    if self._found < n:
+                        current = ub + 1  # intervalle entièrement criblé
+            except KeyboardInterrupt:
+                # Interruption sans stop() (signal par défaut) : dernier point de reprise sur les
+                # blocs entièrement traités ; statistiques omises si un bloc était en cours
+                self._checkpoint(mm, mmap_path, done[1], done[2], target, count=done[0], stats=clean)
+                raise
+            finally:
+                stream.close()
+
+            avg = total_sum / max(1, self._found)
+            with prof.phase("finalize"):
+                mm.close()
+                del mm
+                gc.collect()
+                if current <= ub:
+                    current = max(pmax + 1, current)
+                write_store_meta(mmap_path, fmt, self._found, pmax, total_sum, target, current, rng,
+                                 self.stats.state())
+            prof.count("store_bytes", _files_size(mmap_path) - store_bytes)
+            return self._found, pmax, total_sum, avg, self.stats.report()
+
+        except Exception:
+            try:
+                if 'mm' in locals():
+                    mm.close()
+                    del mm
+                gc.collect()
+            except Exception:
+                pass
+            raise
+        finally:
+            if 'locked' in locals():
+                release_store_lock(locked)
+            if self.cfg.trace_file:
+                try:
+                    self.profile.write_trace(self.cfg.trace_file)
+                except OSError as e:
+                    self.on_status(f"Trace non écrite : {e}")
+
+
+# ---------- Export ----------
+_POW10 = np.array([10 ** k for k in range(1, 20)], dtype=np.uint64)
+_DIGIT_PAIRS = (np.stack([np.arange(100) // 10, np.arange(100) % 10], axis=1) + ord("0")).astype(np.uint8)
+_DIGIT_PAIRS16 = _DIGIT_PAIRS.view(np.dtype('<u2')).ravel()   # "00".."99" lus par paires d'octets
+
+
+def _fill_digits(block: np.ndarray, v: np.ndarray):
+    # Chiffres de v (exactement D chiffres) dans block (m, D), deux par deux (table de 100 paires).
+    # Tranches de 8 chiffres : une seule division 64 bits par tranche, le reste en uint32.
+    m, d = block.shape
+    npairs = (d + 1) // 2
+    pairs = np.empty((npairs, m), dtype=np.dtype('<u2'))
+    j, rem = npairs, d
+    while rem > 9:
+        v, low = np.divmod(v, np.uint64(10 ** 8))
+        low = low.astype(np.uint32)
+        for _ in range(4):
+            low, r = np.divmod(low, np.uint32(100))
+            j -= 1
+            np.take(_DIGIT_PAIRS16, r, out=pairs[j])
+        rem -= 8
+    v = v.astype(np.uint32)
+    while j:
+        v, r = np.divmod(v, np.uint32(100))
+        j -= 1
+        np.take(_DIGIT_PAIRS16, r, out=pairs[j])
+    # Nombre impair de chiffres : le premier "0" de la première paire est écarté
+    block[...] = np.ascontiguousarray(pairs.T).view(np.uint8)[:, 2 * npairs - d:]
+
+
+def _decimal_layout(v: np.ndarray):
+    # Tableau croissant : valeurs à 1, 2, …, 20 chiffres contiguës ; bornes en O(log n)
+    cuts = np.concatenate(([0], np.searchsorted(v, _POW10), [v.size]))
+    return cuts, int((np.diff(cuts) * np.arange(2, 22)).sum())
+
+
+def format_decimal(values, increasing: bool = False) -> np.ndarray:
+    """Écriture décimale de values (un nombre par ligne, "\n" final compris), en uint8.
+    Les valeurs sont regroupées par nombre de chiffres ; chaque groupe est une matrice
+    (m, chiffres + 1) remplie colonne par colonne. increasing=True évite le tri des groupes."""
+    v = np.ascontiguousarray(values, dtype=np.uint64).ravel()
+    if increasing:
+        return _format_increasing(v, *_decimal_layout(v))
+    ndig = np.searchsorted(_POW10, v, side='right') + 1
+    ends = np.cumsum(ndig + 1)
+    out = np.empty(int(ends[-1]) if v.size else 0, dtype=np.uint8)
+    out[ends - 1] = ord("\n")
+    for d in np.unique(ndig).tolist():
+        idx = np.flatnonzero(ndig == d)
+        block = np.empty((idx.size, d), dtype=np.uint8)
+        _fill_digits(block, v[idx])
+        out[(ends[idx] - 1 - d)[:, None] + np.arange(d)] = block
+    return out
+
+
+def _format_increasing(v: np.ndarray, cuts: np.ndarray, size: int) -> np.ndarray:
+    out = np.empty(size, dtype=np.uint8)
+    pos = 0
+    for d in range(1, 21):
+        lo, hi = int(cuts[d - 1]), int(cuts[d])
+        if hi > lo:
+            block = out[pos:pos + (hi - lo) * (d + 1)].reshape(hi - lo, d + 1)
+            _fill_digits(block[:, :d], v[lo:hi])
+            block[:, d] = ord("\n")
+            pos += block.size
+    return out
+
+
+def _write_at(fd: int, path, buf: np.ndarray, offset: int):
+    # Écriture positionnelle : chaque bloc va directement à sa place dans le fichier
+    view = memoryview(buf)
+    if hasattr(os, "pwrite"):
+        while view:
+            n = os.pwrite(fd, view, offset)
+            view, offset = view[n:], offset + n
+    else:
+        with open(path, "r+b") as f:
+            f.seek(offset)
+            f.write(view)
+
+
+def write_text(chunks, out_file, total: int = None, on_progress=None, should_stop=None,
+               workers: int = None, block: int = 1 << 20, profiler: Profiler = None) -> bool:
+    """Consomme un flux de tableaux croissants (iter_primes, iter_store…) et l'écrit en texte,
+    un nombre par ligne. La taille décimale de chaque bloc se calcule en O(log n) avant
+    formatage : les blocs sont formatés par un pool de threads (numpy relâche le GIL) et
+    écrits à leur position. on_progress(écrit, total) à chaque bloc terminé ; renvoie False
+    si should_stop() a interrompu. profiler : phases layout, format, write, wait, callbacks."""
+    prof = profiler or _NO_PROFILE
+    workers = max(1, workers or os.cpu_count() or 1)
+    fd = os.open(out_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+    offset = written = 0
+    pending = deque()
+    pool = ThreadPoolExecutor(max_workers=workers)
+
+    def job(part, cuts, size, at):
+        with prof.phase("format"):
+            text = _format_increasing(part, cuts, size)
+        with prof.phase("write"):
+            _write_at(fd, out_file, text, at)
+
+    def complete_one():
+        nonlocal written
+        future, n = pending.popleft()
+        with prof.phase("wait"):
+            future.result()
+        written += n
+        if on_progress is not None:
+            with prof.phase("callbacks"):
+                on_progress(written, written if total is None else total)
+
+    try:
+        for chunk in chunks:
+            for i in range(0, chunk.size, block):
+                if should_stop is not None and should_stop():
+                    return False
+                part = chunk[i:i + block]
+                with prof.phase("layout"):
+                    cuts, size = _decimal_layout(part)
+                pending.append((pool.submit(job, part, cuts, size, offset), part.size))
+                prof.count("blocks")
+                prof.count("values", part.size)
+                prof.count("bytes_written", size)
+                offset += size
+                while len(pending) >= 2 * workers:
+                    complete_one()
+        while pending:
+            complete_one()
+        # Pas de saut de ligne après le dernier nombre
+        if offset:
+            os.ftruncate(fd, offset - 1)
+        return True
+    finally:
+        for future, _ in pending:
+            future.cancel()
+        pool.shutdown(wait=True)
+        os.close(fd)
+
+
+def parse_decimal(data) -> np.ndarray:
+    """Inverse de format_decimal : texte (un nombre par ligne, octets ou uint8) -> uint64.
+    Lignes regroupées par longueur ; pour un texte croissant chaque groupe est une tranche
+    contiguë, lue comme une matrice (m, longueur + 1) sans indexation."""
+    data = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray, memoryview)) else data
+    if data.size and data[-1] != ord("\n"):
+        data = np.append(data, np.uint8(ord("\n")))   # dernière ligne sans saut de ligne
+    ends = np.flatnonzero(data == ord("\n"))
+    starts = np.empty(ends.size, dtype=np.int64)
+    starts[:1] = 0
+    starts[1:] = ends[:-1] + 1
+    lens = ends - starts
+    out = np.zeros(ends.size, dtype=np.uint64)
+    for d in np.flatnonzero(np.bincount(lens)).tolist():
+        if d == 0:
+            continue
+        if d > 20:
+            raise ValueError("Nombre de plus de 20 chiffres.")
+        idx = np.flatnonzero(lens == d)
+        lo, hi = int(idx[0]), int(idx[-1]) + 1
+        if hi - lo == idx.size:
+            s0 = int(starts[lo])
+            digits = data[s0:s0 + (hi - lo) * (d + 1)].reshape(hi - lo, d + 1)[:, :d] - np.uint8(ord("0"))
+            idx = slice(lo, hi)
+        else:
+            digits = data[starts[idx, None] + np.arange(d)] - np.uint8(ord("0"))
+        if (digits > 9).any():
+            raise ValueError("Caractère non numérique.")
+        out[idx] = digits.astype(np.uint64) @ (np.uint64(10) ** np.arange(d - 1, -1, -1, dtype=np.uint64))
+    return out[lens > 0]
+
+
+_RAW_DTYPES = {"u32": "<u4", "u64": "<u8"}
+
+
+def _write_raw(chunks, f, dtype: np.dtype, total: int, on_progress, should_stop, profiler=None) -> int:
+    # Tableaux recopiés tels quels dans f (sans copie pour un magasin uint64 little-endian)
+    prof = profiler or _NO_PROFILE
+    written = 0
+    for chunk in chunks:
+        if should_stop is not None and should_stop():
+            return -1
+        chunk = chunk[:max(0, total - written)] if total is not None else chunk
+        if not chunk.size:
+            continue
+        with prof.phase("convert"):
+            if dtype.itemsize == 4 and int(chunk.max()) >= 1 << 32:
+                raise ValueError("Valeur >= 2^32 : export uint32 impossible, choisir uint64.")
+            raw = np.ascontiguousarray(chunk, dtype=dtype)
+        with prof.phase("write"):
+            f.write(memoryview(raw))
+        prof.count("blocks")
+        prof.count("values", chunk.size)
+        prof.count("bytes_written", raw.nbytes)
+        written += chunk.size
+        if on_progress is not None:
+            with prof.phase("callbacks"):
+                on_progress(written, written if total is None else total)
+    return written
+
+
+def write_raw(chunks, out_file, dtype="<u8", total: int = None, on_progress=None, should_stop=None,
+              profiler: Profiler = None) -> bool:
+    """Binaire brut little-endian (uint32 ou uint64), lisible par np.fromfile / np.memmap."""
+    with open(out_file, "wb") as f:
+        return _write_raw(chunks, f, np.dtype(dtype), total, on_progress, should_stop, profiler) >= 0
+
+
+def write_npy(chunks, out_file, total: int, on_progress=None, should_stop=None, profiler: Profiler = None) -> bool:
+    """Fichier .npy (uint64) : en-tête pour total valeurs puis corps écrit en flux, sans
+    construire le tableau en mémoire."""
+    with open(out_file, "wb") as f:
+        np.lib.format.write_array_header_1_0(
+            f, {"descr": "<u8", "fortran_order": False, "shape": (int(total),)})
+        written = _write_raw(chunks, f, np.dtype("<u8"), total, on_progress, should_stop, profiler)
+    if 0 <= written < total:
+        raise ValueError(f"Flux plus court que prévu : {written} valeurs sur {total}.")
+    return written >= 0
+
+
+# Conteneur .pdz : en-tête (magie, codec), blocs compressés indépendants, index, pied de page.
+# Un bloc = premier terme absolu + écarts (divisés par 2 s'ils sont tous pairs) sur 1, 2, 4
+# ou 8 octets, rangés par plans d'octets (poids faibles puis forts) avant compression.
+_PDZ_MAGIC = b"PDZ1"
+_PDZ_CODECS = {
+    "zlib": (lambda raw: zlib.compress(raw, 6), zlib.decompress),
+    "lzma": (lambda raw: lzma.compress(raw, preset=6), lzma.decompress),
+    "bz2": (lambda raw: bz2.compress(raw, 9), bz2.decompress),
+}
+_PDZ_INDEX_DTYPE = np.dtype([
+    ("offset", "<u8"), ("size", "<u8"), ("count", "<u8"),
+    ("first", "<u8"), ("width", "<u8"), ("shift", "<u8"),
+])
+_PDZ_FOOTER_DTYPE = np.dtype([("index", "<u8"), ("blocks", "<u8"), ("count", "<u8"), ("magic", "S4")])
+
+
+def _pdz_encode(v: np.ndarray, compress):
+    if v.size > 1 and (v[1:] < v[:-1]).any():
+        raise ValueError("Valeurs non croissantes : export en écarts impossible.")
+    d = np.diff(v)
+    shift = int(d.size > 0 and not (d & np.uint64(1)).any())
+    d >>= np.uint64(shift)
+    top = int(d.max()) if d.size else 0
+    width = next(w for w in (1, 2, 4, 8) if top < 1 << (8 * w))
+    planes = d.astype(f"<u{width}").view(np.uint8).reshape(-1, width).T
+    return compress(planes.tobytes()), int(v[0]), width, shift
+
+
+def _pdz_decode(payload: bytes, rec, decompress) -> np.ndarray:
+    n, width, shift = int(rec["count"]), int(rec["width"]), int(rec["shift"])
+    planes = np.frombuffer(decompress(payload), dtype=np.uint8).reshape(width, n - 1)
+    d = np.ascontiguousarray(planes.T).view(f"<u{width}").ravel().astype(np.uint64)
+    out = np.empty(n, dtype=np.uint64)
+    out[0] = rec["first"]
+    np.cumsum(d << np.uint64(shift), out=out[1:])
+    out[1:] += np.uint64(rec["first"])
+    return out
+
+
+def write_pdz(chunks, out_file, codec: str = "zlib", total: int = None, on_progress=None,
+              should_stop=None, workers: int = None, block: int = 1 << 20, profiler: Profiler = None) -> bool:
+    """Écarts compressés (.pdz) d'un flux croissant : blocs encodés et compressés en parallèle
+    par un pool de threads (zlib, lzma et bz2 relâchent le GIL), écrits dans l'ordre."""
+    prof = profiler or _NO_PROFILE
+    compress = _PDZ_CODECS[codec][0]
+
+    def job(part):
+        with prof.phase("encode"):
+            return _pdz_encode(part, compress)
+
+    workers = max(1, workers or os.cpu_count() or 1)
+    pool = ThreadPoolExecutor(max_workers=workers)
+    pending, records = deque(), []
+    written = 0
+    with open(out_file, "wb") as f:
+        f.write(_PDZ_MAGIC + codec.encode("ascii").ljust(8, b"\0"))
+        offset = f.tell()
+
+        def complete_one():
+            nonlocal written, offset
+            future, n = pending.popleft()
+            with prof.phase("wait"):
+                payload, first, width, shift = future.result()
+            with prof.phase("write"):
+                f.write(payload)
+            prof.count("blocks")
+            prof.count("values", n)
+            prof.count("bytes_written", len(payload))
+            records.append((offset, len(payload), n, first, width, shift))
+            offset += len(payload)
+            written += n
+            if on_progress is not None:
+                with prof.phase("callbacks"):
+                    on_progress(written, written if total is None else total)
+
+        try:
+            for chunk in chunks:
+                for i in range(0, chunk.size, block):
+                    if should_stop is not None and should_stop():
+                        return False
+                    part = chunk[i:i + block]
+                    pending.append((pool.submit(job, part), part.size))
+                    while len(pending) >= 2 * workers:
+                        complete_one()
+            while pending:
+                complete_one()
+        finally:
+            for future, _ in pending:
+                future.cancel()
+            pool.shutdown(wait=True)
+        f.write(np.array(records, dtype=_PDZ_INDEX_DTYPE).tobytes())
+        f.write(np.array([(offset, len(records), written, _PDZ_MAGIC)], dtype=_PDZ_FOOTER_DTYPE).tobytes())
+    return True
+
+
+def read_pdz(path, workers: int = None) -> np.ndarray:
+    """Relit un fichier .pdz en uint64 (blocs décompressés en parallèle)."""
+    with open(path, "rb") as f:
+        head = f.read(12)
+        if head[:4] != _PDZ_MAGIC:
+            raise ValueError(f"Fichier .pdz invalide : {path}")
+        decompress = _PDZ_CODECS[head[4:].rstrip(b"\0").decode("ascii")][1]
+        f.seek(-_PDZ_FOOTER_DTYPE.itemsize, os.SEEK_END)
+        footer = np.frombuffer(f.read(_PDZ_FOOTER_DTYPE.itemsize), dtype=_PDZ_FOOTER_DTYPE)[0]
+        if footer["magic"] != _PDZ_MAGIC:
+            raise ValueError(f"Fichier .pdz incomplet : {path}")
+        f.seek(int(footer["index"]))
+        index = np.frombuffer(f.read(int(footer["blocks"]) * _PDZ_INDEX_DTYPE.itemsize), dtype=_PDZ_INDEX_DTYPE)
+        payloads = []
+        for rec in index:
+            f.seek(int(rec["offset"]))
+            payloads.append(f.read(int(rec["size"])))
+    out = np.empty(int(footer["count"]), dtype=np.uint64)
+    starts = np.concatenate(([0], np.cumsum(index["count"], dtype=np.int64)))
+
+    def job(i):
+        out[starts[i]:starts[i + 1]] = _pdz_decode(payloads[i], index[i], decompress)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers or os.cpu_count() or 1)) as pool:
+        list(pool.map(job, range(index.size)))
+    return out
+
+
+EXPORT_FORMATS = {
+    "txt": (".txt", "Texte, un nombre par ligne"),
+    "u32": (".u32", "Binaire uint32 little-endian"),
+    "u64": (".u64", "Binaire uint64 little-endian"),
+    "npy": (".npy", "Tableau NumPy uint64"),
+    "zlib": (".pdz", "Écarts compressés zlib"),
+    "lzma": (".pdz", "Écarts compressés lzma"),
+    "bz2": (".pdz", "Écarts compressés bz2"),
+}
+
+
+def export_format_for(path) -> str:
+    """Format d'export déduit de l'extension (.pdz : zlib), texte par défaut."""
+    suffix = Path(path).suffix
+    return next((fmt for fmt, (ext, _) in EXPORT_FORMATS.items() if ext == suffix), "txt")
+
+
+def read_export(path, fmt: str = None):
+    """Relit un export en tableau NumPy (memmap pour les formats binaires bruts et .npy)."""
+    fmt = fmt or export_format_for(path)
+    if fmt == "txt":
+        return parse_decimal(np.fromfile(path, dtype=np.uint8))
+    if fmt in ("u32", "u64"):
+        dtype = _RAW_DTYPES[fmt]
+        return np.memmap(path, dtype=dtype, mode="r") if os.path.getsize(path) else np.zeros(0, dtype=dtype)
+    if fmt == "npy":
+        return np.load(path, mmap_mode="r")
+    return read_pdz(path)
+
+
+def export_store(store_path: Path, count: int, out_file, fmt: str = "txt", on_progress=None,
+                 should_stop=None, workers: int = None, rows: tuple = None, values: tuple = None,
+                 profiler: Profiler = None) -> bool:
+    """Exporte les count premières lignes du magasin au format fmt (voir EXPORT_FORMATS), ou
+    seulement une sous-plage : rows=(i, j) par indice, values=(a, b) par valeur (voir
+    store_rows). Seule la tranche est lue. Renvoie False si should_stop() a interrompu.
+    profiler : phase read (lecture du magasin) et phases du writer."""
+    prof = profiler or _NO_PROFILE
+    start, stop = store_rows(open_store(store_path), count, rows, values)
+    total = stop - start
+    source = iter_store(store_path, start, stop, block=1 << 22)
+    stream = prof.timed(source, "read") if prof.enabled else source
+    try:
+        if fmt == "txt":
+            return write_text(stream, out_file, total, on_progress, should_stop, workers, profiler=prof)
+        if fmt in ("u32", "u64"):
+            return write_raw(stream, out_file, _RAW_DTYPES[fmt], total, on_progress, should_stop, prof)
+        if fmt == "npy":
+            return write_npy(stream, out_file, total, on_progress, should_stop, prof)
+        if fmt in _PDZ_CODECS:
+            return write_pdz(stream, out_file, fmt, total, on_progress, should_stop, workers, profiler=prof)
+        raise ValueError(f"Format d'export inconnu : {fmt}")
+    finally:
+        source.close()
+
+
+def export_text(store_path: Path, count: int, out_file, on_progress=None, should_stop=None,
+                workers: int = None) -> bool:
+    """Écrit les count premières lignes du magasin en texte (un nombre par ligne)."""
+    return export_store(store_path, count, out_file, "txt", on_progress, should_stop, workers)
+
+
+# ---------- Saisie ----------
+def parse_int_expr(text: str) -> int:
+    """Somme de termes entiers : 1000000, 1e15, 10^15 (exacts, sans passer par float)."""
+    total = 0
+    for term in text.replace(" ", "").split("+"):
+        if "^" in term:
+            base, exp = term.split("^")
+            value = int(base) ** int(exp)
+        else:
+            value = Decimal(term)
+            if value != value.to_integral_value():
+                raise ValueError(term)
+        total += int(value)
+    return total
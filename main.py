@@ -3,15 +3,14 @@
 
 import sys
 import os
-import math
 import time
-import tempfile
-import gc
-import shutil
+import re
+import multiprocessing
+from collections import OrderedDict
 from pathlib import Path
-from dataclasses import dataclass
 
 import numpy as np
+
 from PySide6.QtCore import (
     Qt,
     QAbstractTableModel,
@@ -21,8 +20,11 @@ from PySide6.QtCore import (
     QTimer,
     QEasingCurve,
     QPropertyAnimation,
+    QPointF,
+    QLineF,
+    QRectF,
 )
-from PySide6.QtGui import QColor, QPalette, QFont, QGuiApplication
+from PySide6.QtGui import QColor, QPalette, QFont, QGuiApplication, QPainter, QPen, QPolygonF
 from PySide6.QtWidgets import (
     QApplication,
     QWidget,
@@ -36,41 +38,44 @@ from PySide6.QtWidgets import (
     QTableView,
     QProgressBar,
     QFileDialog,
+    QInputDialog,
     QMessageBox,
     QAbstractItemView,
     QDialog,
     QGraphicsDropShadowEffect,
     QFrame,
     QHeaderView,
+    QScrollBar,
+    QTabWidget,
+    QComboBox,
+    QCheckBox,
     QStyle,
     QStyleOption,
 )
 
-
-# ---------- Bornes supérieures (resserrées) ----------
-def upper_bound_nth_prime(n: int) -> int:
-    if n < 6:
-        return 15
-    ln_n = math.log(n)
-    lnln = math.log(ln_n)
-    bound = n * (ln_n + lnln - 1 + (lnln - 2.0) / ln_n)
-    if n >= 1_000_000:
-        bound *= 1.08
-    elif n >= 100_000:
-        bound *= 1.06
-    else:
-        bound *= 1.04
-    return int(bound) + 1024
-
-
-# ---------- Config ----------
-@dataclass
-class GenConfig:
-    count: int
-    segment_size: int = 1 << 22
-    tmp_dir: Path = Path(tempfile.gettempdir())
-    mmap_filename: str = "primes_memmap.dat"
-    update_interval_ms: int = 75
+from engine import (
+    GapPyramid,
+    GenConfig,
+    PrimeGenerator,
+    Profiler,
+    EXPORT_FORMATS,
+    STORE_FORMATS,
+    auto_tune,
+    export_store,
+    format_decimal,
+    li,
+    load_tuning,
+    nth_prime_window,
+    open_store,
+    parse_int_expr,
+    pid_alive,
+    pyramid_path,
+    read_store_meta,
+    riemann_r,
+    store_locked,
+    store_meta_pending,
+    tuned_settings,
+)
 
 
 # ---------- Utilitaires UI ----------
@@ -101,281 +106,329 @@ def set_monospace(widget: QWidget):
     widget.setFont(font)
 
 
+def trace_path(name: str):
+    # Trace Chrome des phases dans le dossier NB_PREMIER_TRACE s'il est défini, sinon aucune
+    folder = os.environ.get("NB_PREMIER_TRACE")
+    return str(Path(folder) / f"{name}.trace.json") if folder else None
+
+
 # ---------- Worker thread ----------
 class PrimeGenThread(QThread):
+    """Relais Qt du moteur : callbacks de PrimeGenerator -> signaux (thread-safe)."""
     progress = Signal(int, int)                # found, total
-    finished_ok = Signal(object, object, object, float)  # n_found, pmax, sum, avg
+    rows = Signal(object)                      # lignes lisibles dans le magasin
+    finished_ok = Signal(object, object, object, float, object)  # n_found, pmax, sum, avg, stats
     failed = Signal(str)
     status_update = Signal(str)
+    profiled = Signal(str)                     # Profiler.summary() du run, succès ou échec
 
     def __init__(self, cfg: GenConfig, parent=None):
         super().__init__(parent)
         self.cfg = cfg
-        self._stop = False
-        self._found = 0
-        self._target = cfg.count
-        self._last_update_ms = 0
+        self.engine = PrimeGenerator(cfg, on_progress=self.progress.emit, on_status=self.status_update.emit,
+                                     on_rows=self.rows.emit)
 
     def stop(self):
-        self._stop = True
-
-    @staticmethod
-    def _safe_remove(path: Path, retries: int = 3):
-        for _ in range(retries):
-            try:
-                if path.exists():
-                    path.unlink()
-                return True
-            except Exception:
-                time.sleep(0.05)
-        return not path.exists()
-
-    def _emit_progress_if_needed(self):
-        now_ms = int(time.time() * 1000)
-        if now_ms - self._last_update_ms >= self.cfg.update_interval_ms:
-            self.progress.emit(self._found, self._target)
-            self._last_update_ms = now_ms
-
-    def _ensure_disk_space(self, n: int, target_dir: Path):
-        required = 8 * n + (16 << 20)
-        try:
-            usage = shutil.disk_usage(str(target_dir))
-            if usage.free < required:
-                return False, required, usage.free
-        except Exception:
-            return True, required, None
-        return True, required, usage.free
+        self.engine.stop()
 
     def run(self):
         try:
-            n = int(self.cfg.count)
-            if n <= 0:
-                self.failed.emit("Le nombre demandé doit être > 0.")
-                return
-
-            ok_space, need_bytes, free_bytes = self._ensure_disk_space(n, self.cfg.tmp_dir)
-            if not ok_space:
-                need_gb = need_bytes / (1 << 30)
-                free_gb = (free_bytes or 0) / (1 << 30)
-                self.failed.emit(
-                    f"Espace disque insuffisant dans {self.cfg.tmp_dir}.\n"
-                    f"Requis ≈ {need_gb:.2f} Gio, libre ≈ {free_gb:.2f} Gio."
-                )
-                return
-
-            self.status_update.emit("Calcul de la borne supérieure…")
-            ub = upper_bound_nth_prime(n)
-
-            self.status_update.emit("Crible de base jusqu'à √borne…")
-            base_limit = int(math.isqrt(ub)) + 1
-            base_sieve_size = (base_limit + 1) // 2
-            base_sieve = np.ones(base_sieve_size, dtype=np.bool_)
-            sqrt_bl = int(math.isqrt(base_limit)) + 1
-            for i in range(1, (sqrt_bl + 1) // 2):
-                if base_sieve[i]:
-                    p = 2 * i + 1
-                    start = (p * p) // 2
-                    base_sieve[start::p] = False
-
-            base_indices = np.nonzero(base_sieve)[0][1:]
-            base_primes = base_indices * 2 + 1
-            odd_primes = base_primes.astype(np.int64, copy=False)
-
-            mmap_path = self.cfg.tmp_dir / self.cfg.mmap_filename
-            if mmap_path.exists():
-                if not self._safe_remove(mmap_path):
-                    self.failed.emit(f"Impossible de supprimer : {mmap_path}")
-                    return
-
-            mm = np.memmap(mmap_path, dtype=np.uint64, mode='w+', shape=(n,))
-            self._found = 0
-            total_sum = np.uint64(0)
-            pmax = 0
-
-            # add 2
-            mm[0] = 2
-            self._found = 1
-            total_sum = np.uint64(2)
-            pmax = 2
-            self._emit_progress_if_needed()
-
-            if self._stop:
-                mm.flush(); del mm; gc.collect()
-                self.finished_ok.emit(self._found, pmax, int(total_sum), float(int(total_sum) / max(1, self._found)))
-                return
-            if self._found >= n:
-                mm.flush(); del mm; gc.collect()
-                self.finished_ok.emit(self._found, pmax, int(total_sum), float(int(total_sum)))
-                return
-
-            self.status_update.emit("Crible segmenté en cours…")
-            seg_impairs = int(self.cfg.segment_size)
-            current = 3
-            next_mults = None
-
-            while self._found < n and not self._stop:
-                seg_end = min(current + 2 * seg_impairs, ub + 1)
-                if current >= seg_end:
-                    ub = int(ub * 1.2) + 1024
-                    seg_end = current + 2 * seg_impairs
-
-                seg_len = (seg_end - current + 1) // 2
-                if seg_len <= 0:
-                    break
-
-                segment = np.ones(seg_len, dtype=np.bool_)
-
-                sqrt_seg = int(math.isqrt(seg_end - 1))
-                limit_idx = int(np.searchsorted(odd_primes, sqrt_seg, side='right'))
-
-                if limit_idx > 0:
-                    if next_mults is None or len(next_mults) != len(odd_primes):
-                        next_mults = np.empty(len(odd_primes), dtype=np.int64)
-                        c = current
-                        for i, p in enumerate(odd_primes):
-                            s = p * p
-                            if s < c:
-                                r = c % p
-                                s = (c if r == 0 else c + (p - r))
-                            if (s & 1) == 0:
-                                s += p
-                            next_mults[i] = s
-
-                    c = current
-                    se = seg_end
-                    for i in range(limit_idx):
-                        p = int(odd_primes[i])
-                        s = int(next_mults[i])
-                        if s >= se:
-                            continue
-                        idx = (s - c) >> 1
-                        segment[idx::p] = False
-                        step = p << 1
-                        delta = se - s
-                        k = (delta + step - 1) // step
-                        next_mults[i] = s + k * step
-
-                prime_idx = np.flatnonzero(segment)
-                if prime_idx.size:
-                    primes = (current + (prime_idx.astype(np.int64) << 1)).astype(np.uint64, copy=False)
-                    can_take = n - self._found
-                    if primes.size > can_take:
-                        primes = primes[:can_take]
-                    start = self._found
-                    end = start + primes.size
-                    if primes.size:
-                        mm[start:end] = primes
-                        self._found = end
-                        block_sum = np.add.reduce(primes, dtype=np.uint64)
-                        total_sum = (total_sum + block_sum).astype(np.uint64, copy=False)
-                        pmax = int(primes[-1])
-                        self._emit_progress_if_needed()
-                        if self._found >= n or self._stop:
-                            break
-
-                current = seg_end
-                if current >= ub and self._found < n:
-                    ub = int(ub * 1.2) + 1024
-
-            avg = float(int(total_sum) / max(1, self._found))
-            mm.flush()
-            del mm
-            gc.collect()
-            self.finished_ok.emit(self._found, pmax, int(total_sum), avg)
-
+            result = self.engine.run()
         except Exception as e:
-            try:
-                if 'mm' in locals():
-                    del mm
-                gc.collect()
-            except Exception:
-                pass
             self.failed.emit(str(e))
+            return
+        finally:
+            self.profiled.emit(self.engine.profile.summary())
+        self.finished_ok.emit(*result)
 
 
 # ---------- Modèle Qt ----------
-class PrimePagedModel(QAbstractTableModel):
-    def __init__(self, mmap_path: Path, count_ref: callable, page_size=10_000_000, parent=None):
+class PrimeTableModel(QAbstractTableModel):
+    """Modèle virtuel sur tout le magasin : la vue voit une fenêtre d'au plus WINDOW_ROWS
+    lignes à partir de offset (déplacée par la barre de défilement de MainWindow). Les
+    valeurs sont lues par blocs (une tranche), mises en forme une fois et gardées en LRU.
+    Pendant la génération, set_rows() ajoute les lignes publiées sur le même mapping."""
+    WINDOW_ROWS = 1 << 20    # lignes exposées à la vue (hauteur en pixels loin de 2^31)
+    BLOCK_ROWS = 4096
+    CACHE_BLOCKS = 64
+
+    def __init__(self, mmap_path: Path, rows: int = 0, parent=None):
         super().__init__(parent)
         self.mmap_path = Path(mmap_path) if mmap_path is not None else None
-        self.count_ref = count_ref
+        self._rows = int(rows)
         self._mm = None
-        self.page_size = page_size
+        self._blocks = OrderedDict()
         self.offset = 0
         self._open_memmap()
 
     def _open_memmap(self):
+        self._blocks.clear()
         if self.mmap_path and self.mmap_path.exists():
-            self._mm = np.memmap(self.mmap_path, dtype=np.uint64, mode='r')
+            self._mm = open_store(self.mmap_path)
         else:
             self._mm = None
 
-    def rowCount(self, parent=QModelIndex()):
-        total = self.count_ref() or 0
-        if total == 0:
+    def total(self) -> int:
+        if self._mm is None:
             return 0
-        return min(self.page_size, total - self.offset)
+        return min(self._rows, len(self._mm))
+
+    def rowCount(self, parent=QModelIndex()):
+        return max(0, min(self.WINDOW_ROWS, self.total() - self.offset))
 
     def columnCount(self, parent=QModelIndex()):
         return 2
 
+    def _block(self, b: int) -> list:
+        # Bloc b mis en forme : une tranche du magasin, un seul formatage vectorisé
+        lo = b * self.BLOCK_ROWS
+        values = np.asarray(self._mm[lo:min(lo + self.BLOCK_ROWS, self.total())], dtype=np.uint64)
+        cells = format_decimal(values, increasing=True).tobytes().decode("ascii").split("\n")[:-1]
+        self._blocks[b] = cells
+        if len(self._blocks) > self.CACHE_BLOCKS:
+            self._blocks.popitem(last=False)
+        return cells
+
     def data(self, index, role=Qt.DisplayRole):
-        if not index.isValid() or self._mm is None:
+        if role != Qt.DisplayRole or not index.isValid() or self._mm is None:
             return None
         row = self.offset + index.row()
-        if row >= (len(self._mm) if self._mm is not None else 0):
-            return None
-        if role == Qt.DisplayRole:
-            if index.column() == 0:
-                return row + 1
-            elif index.column() == 1:
-                return int(self._mm[row])
-        return None
+        if index.column() == 0:
+            return row + 1
+        b, i = divmod(row, self.BLOCK_ROWS)
+        cells = self._blocks.get(b)
+        if cells is None or i >= len(cells):
+            if row >= self.total():
+                return None
+            cells = self._block(b)   # bloc absent ou encore incomplet
+        else:
+            self._blocks.move_to_end(b)
+        return cells[i]
 
     def headerData(self, section, orientation, role=Qt.DisplayRole):
         if role != Qt.DisplayRole:
             return None
         if orientation == Qt.Horizontal:
             return ["Index", "Nombre premier"][section]
-        return str(section + 1)
-
-    def next_page(self):
-        total = self.count_ref() or 0
-        if self.offset + self.page_size < total:
-            self.offset += self.page_size
-            self.layoutChanged.emit()
-
-    def prev_page(self):
-        if self.offset - self.page_size >= 0:
-            self.offset -= self.page_size
-            self.layoutChanged.emit()
-
-    def goto_index(self, idx: int):
-        total = self.count_ref() or 0
-        if 0 <= idx < total:
-            self.offset = (idx // self.page_size) * self.page_size
-            self.layoutChanged.emit()
-
-    def reload_memmap(self, mmap_path: Path):
+        return str(self.offset + section + 1)
+
+    def offset_for(self, row: int) -> int:
+        """Offset de fenêtre pour afficher row : inchangé tant que row reste loin des bords."""
+        margin = self.WINDOW_ROWS // 8
+        if self.offset + margin <= row < self.offset + self.WINDOW_ROWS - margin:
+            return self.offset
+        return max(0, min(row - self.WINDOW_ROWS // 2, self.total() - self.WINDOW_ROWS))
+
+    def set_offset(self, offset: int):
+        # Déplace la fenêtre : même nombre de lignes, seules les valeurs changent
+        offset = max(0, min(int(offset), self.total() - self.WINDOW_ROWS))
+        if offset != self.offset:
+            self.offset = offset
+            if self.rowCount():
+                self.dataChanged.emit(self.index(0, 0), self.index(self.rowCount() - 1, 1))
+
+    def release(self):
+        # Libère le mapping avant que le fichier ne soit tronqué/agrandi (requis sous Windows)
+        self.beginResetModel()
+        self._mm = None
+        self._blocks.clear()
+        self.endResetModel()
+
+    def reload_memmap(self, mmap_path: Path, rows: int):
+        self.beginResetModel()
         self.mmap_path = Path(mmap_path)
+        self._rows = int(rows)
         self._mm = None
         self.offset = 0
         self._open_memmap()
-        self.beginResetModel()
         self.endResetModel()
 
+    def set_rows(self, rows: int):
+        """Nouveau nombre de lignes lisibles : les lignes ajoutées entrent par
+        beginInsertRows, sans rouvrir le magasin ni réinitialiser la vue."""
+        rows = int(rows)
+        if self._mm is None or rows < self._rows:
+            self.reload_memmap(self.mmap_path, rows)
+            return
+        if rows > len(self._mm):
+            # Magasin agrandi : index relu en O(nouveaux blocs), ou memmap refait
+            if hasattr(self._mm, "refresh"):
+                self._mm.refresh()
+            else:
+                self._mm = np.memmap(self.mmap_path, dtype=np.uint64, mode='r')
+        first = self.rowCount()
+        last = max(0, min(self.WINDOW_ROWS, min(rows, len(self._mm)) - self.offset))
+        if last > first:
+            self.beginInsertRows(QModelIndex(), first, last - 1)
+            self._rows = rows
+            self.endInsertRows()
+        else:
+            self._rows = rows
+
+
+# ---------- Graphique ----------
+class PyramidChart(QWidget):
+    """Graphique de la pyramide d'agrégats (.pyr) sur [x0, x1) : chaque dessin lit O(pixels)
+    seaux au niveau adapté au zoom. Molette : zoom, glisser : déplacement, double-clic : tout."""
+    MODES = ["Écarts : min / moyen / max", "Densité : premiers par entier", "π(x) − li(x)"]
+    MARGINS = (92, 14, 14, 30)   # gauche, haut, droite, bas
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pyramid = None
+        self.li_from = None      # magasin d'intervalle [a, b] : π et li comptés à partir de a
+        self.mode = 0
+        self.view = (0.0, 1.0)
+        self._drag = None
+        self.setMinimumHeight(220)
+
+    def set_pyramid(self, pyramid, li_from: int = None):
+        self.pyramid = pyramid
+        self.li_from = li_from
+        self.reset_view()
+
+    def set_mode(self, mode: int):
+        self.mode = int(mode)
+        self.update()
+
+    def reset_view(self):
+        if self.pyramid is not None:
+            lo, hi = self.pyramid.extent()
+            self.view = (float(lo), float(max(hi, lo + 1)))
+        self.update()
+
+    def _set_view(self, x0: float, span: float):
+        lo, hi = self.pyramid.extent()
+        span = min(float(hi - lo), span)
+        x0 = max(float(lo), min(x0, hi - span))
+        self.view = (x0, x0 + span)
+        self.update()
+
+    def _plot_rect(self) -> QRectF:
+        left, top, right, bottom = self.MARGINS
+        return QRectF(left, top, max(1, self.width() - left - right), max(1, self.height() - top - bottom))
+
+    def wheelEvent(self, event):
+        if self.pyramid is None:
+            return
+        x0, x1 = self.view
+        rect = self._plot_rect()
+        xc = x0 + (event.position().x() - rect.left()) / rect.width() * (x1 - x0)
+        span = max(8.0 * self.pyramid.width, (x1 - x0) * 0.8 ** (event.angleDelta().y() / 120))
+        self._set_view(xc - (xc - x0) * span / (x1 - x0), span)
+
+    def mousePressEvent(self, event):
+        if event.button() == Qt.LeftButton:
+            self._drag = (event.position().x(), self.view)
+
+    def mouseMoveEvent(self, event):
+        if self._drag is None or self.pyramid is None:
+            return
+        start, (x0, x1) = self._drag
+        shift = (start - event.position().x()) / self._plot_rect().width() * (x1 - x0)
+        self._set_view(x0 + shift, x1 - x0)
+
+    def mouseReleaseEvent(self, event):
+        self._drag = None
+
+    def mouseDoubleClickEvent(self, event):
+        self.reset_view()
+
+    def _series(self, q: dict):
+        """(bas, haut, courbe, référence) du mode courant ; bas/haut None sans bande."""
+        count = q["count"].astype(np.float64)
+        if self.mode == 0:
+            # Écart moyen ≈ ln x (théorème des nombres premiers) en référence
+            has_gap = q["gmax"] > 0
+            mean = np.full(count.size, np.nan)
+            np.divide(q["gsum"].astype(np.float64), count, out=mean, where=count > 0)
+            low = np.where(has_gap, q["gmin"], np.nan)
+            high = np.where(has_gap, q["gmax"], np.nan)
+            return low, high, mean, np.log(np.maximum(q["x"] + q["width"] / 2, 2.0))
+        if self.mode == 1:
+            return None, None, count / q["width"], 1.0 / np.log(np.maximum(q["x"] + q["width"] / 2, 3.0))
+        # Dernier seau borné au dernier premier : li n'est pas évalué au-delà des données
+        x_end = np.maximum(q["x_end"], 2.0)
+        if self.li_from is not None and self.li_from > 2:
+            curve = q["pi"] - (li(x_end) - li(float(self.li_from)))
+        else:
+            curve = q["pi"] - li(x_end)
+        return None, None, curve, np.zeros_like(curve)
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QColor(23, 23, 26))
+        painter.setPen(QColor("#A0A0AA"))
+        if self.pyramid is None or not self.pyramid.sizes[0]:
+            painter.drawText(self.rect(), Qt.AlignCenter,
+                             "Pas de pyramide : cocher « Graphique » avant de générer ; elle est écrite "
+                             "aux points de reprise et en fin de génération.")
+            return
+        rect = self._plot_rect()
+        x0, x1 = self.view
+        q = self.pyramid.buckets(x0, x1, int(rect.width()))
+        if not q["count"].size:
+            return
+        low, high, curve, ref = self._series(q)
+        values = np.concatenate([a[np.isfinite(a)] for a in (low, high, curve, ref) if a is not None])
+        y0, y1 = float(values.min()), float(values.max())
+        pad = (y1 - y0) * 0.05 or 1.0
+        y0, y1 = y0 - pad, y1 + pad
+
+        xs = rect.left() + (q["x"] + q["width"] / 2 - x0) / (x1 - x0) * rect.width()
+
+        def ys(y):
+            return rect.bottom() - (np.asarray(y, dtype=np.float64) - y0) / (y1 - y0) * rect.height()
+
+        def polyline(y, pen):
+            ok = np.isfinite(y)
+            painter.setPen(pen)
+            painter.drawPolyline(QPolygonF([QPointF(a, b) for a, b in zip(xs[ok].tolist(), ys(y[ok]).tolist())]))
+
+        painter.setClipRect(rect)
+        if low is not None:
+            ok = np.isfinite(low)
+            painter.setPen(QPen(QColor(65, 160, 255, 90), max(1.0, rect.width() / max(1, q["count"].size))))
+            painter.drawLines([QLineF(a, b, a, c) for a, b, c in
+                               zip(xs[ok].tolist(), ys(low[ok]).tolist(), ys(high[ok]).tolist())])
+        polyline(ref, QPen(QColor("#A0A0AA"), 1, Qt.DashLine))
+        polyline(curve, QPen(QColor(65, 160, 255), 1.6))
+        painter.setClipping(False)
+
+        painter.setPen(QColor("#2C2C33"))
+        painter.drawRect(rect)
+        painter.setPen(QColor("#A0A0AA"))
+        def fmt(v):
+            return f"{v:.3g}" if self.mode == 1 else f"{v:,.0f}".replace(",", " ")
+
+        left = self.MARGINS[0]
+        painter.drawText(QRectF(0, rect.top() - 2, left - 6, 16), Qt.AlignRight, fmt(y1))
+        painter.drawText(QRectF(0, rect.bottom() - 14, left - 6, 16), Qt.AlignRight, fmt(y0))
+        axis = QRectF(rect.left(), rect.bottom() + 6, rect.width(), 18)
+        painter.drawText(axis, Qt.AlignLeft, f"{int(x0):,}".replace(",", " "))
+        painter.drawText(axis, Qt.AlignRight, f"{int(x1):,}".replace(",", " "))
+        painter.drawText(axis, Qt.AlignHCenter, f"seaux de {q['width']:,}".replace(",", " "))
+
 
 # --- Worker d'export ---
 class ExportThread(QThread):
     progress = Signal(int, int)   # écrit, total
     finished_ok = Signal(str)
     failed = Signal(str)
+    profiled = Signal(str)
 
-    def __init__(self, mmap_path: Path, count: int, out_file: str, parent=None):
+    def __init__(self, mmap_path: Path, count: int, out_file: str, fmt: str = "txt",
+                 rows: tuple = None, values: tuple = None, parent=None):
         super().__init__(parent)
         self.mmap_path = mmap_path
         self.count = count
         self.out_file = out_file
+        self.fmt = fmt
+        self.rows = rows
+        self.values = values
+        self.trace_file = trace_path(Path(out_file).name)
+        self.profiler = Profiler(trace=self.trace_file is not None)
         self._stop = False
 
     def stop(self):
@@ -383,24 +436,59 @@ class ExportThread(QThread):
 
     def run(self):
         try:
-            mm = np.memmap(self.mmap_path, dtype=np.uint64, mode="r")
-            total = min(self.count, len(mm))
-            block = 10_000_000
-            with open(self.out_file, "w", encoding="utf-8", buffering=16 * 1024 * 1024, newline="\n") as f:
-                written = 0
-                while written < total and not self._stop:
-                    end = min(written + block, total)
-                    arr = mm[written:end]
-                    arr.tofile(f, sep="\n", format="%d")
-                    if end < total:
-                        f.write("\n")
-                    written = end
-                    self.progress.emit(written, total)
-            del mm
-            if self._stop:
-                self.failed.emit("Export interrompu par l'utilisateur.")
-            else:
-                self.finished_ok.emit(self.out_file)
+            done = export_store(self.mmap_path, self.count, self.out_file, self.fmt,
+                                on_progress=self.progress.emit, should_stop=lambda: self._stop,
+                                rows=self.rows, values=self.values, profiler=self.profiler)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        finally:
+            if self.trace_file:
+                try:
+                    self.profiler.write_trace(self.trace_file)
+                except OSError:
+                    pass
+            self.profiled.emit(self.profiler.summary())
+        if not done:
+            self.failed.emit("Export interrompu par l'utilisateur.")
+        else:
+            self.finished_ok.emit(self.out_file)
+
+
+class NthPrimeThread(QThread):
+    finished_ok = Signal(object, object)  # n, fenêtre [p_n, …, p_{n+k}]
+    failed = Signal(str)
+
+    def __init__(self, n: int, k: int = 0, parent=None):
+        super().__init__(parent)
+        self.n = n
+        self.k = k
+
+    def run(self):
+        try:
+            self.finished_ok.emit(self.n, nth_prime_window(self.n, self.k).tolist())
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class TuneThread(QThread):
+    """Calibrage de segment_size pour cet hôte (auto_tune) : une fois par machine. Interrompu
+    par stop(), il n'enregistre rien et n'émet pas finished_ok."""
+    finished_ok = Signal(object)   # réglage enregistré
+    failed = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._stop = False
+
+    def stop(self):
+        self._stop = True
+
+    def run(self):
+        try:
+            tuning = auto_tune(should_stop=lambda: self._stop)
+            if tuning is not None:
+                self.finished_ok.emit(tuning)
         except Exception as e:
             self.failed.emit(str(e))
 
@@ -447,6 +535,7 @@ class MainWindow(QMainWindow):
         self._sum = 0
         self._avg = 0.0
         self._thread = None
+        self._syncing = False
 
         # Config
         self.cfg = GenConfig(count=10)
@@ -464,13 +553,20 @@ class MainWindow(QMainWindow):
         self._tune_table()
 
         # Modèle memmap
-        self.model = PrimePagedModel(self.mmap_path, self.get_found, page_size=10_000_000)
+        self.model = PrimeTableModel(self.mmap_path, self._found)
         self.table.setModel(self.model)
         self._update_pages()
 
         # Liaisons
         self._connect_signals()
 
+        # Génération interrompue lors d'une session précédente : proposée à la reprise
+        self._adopt_interrupted_store()
+
+        # Première session sur cette machine : calibrage du crible en arrière-plan
+        self._tune_thread = None
+        QTimer.singleShot(0, self._start_tuning)
+
         # Entrée par défaut
         self.edit_count.setFocus()
 
@@ -580,6 +676,16 @@ class MainWindow(QMainWindow):
             QScrollBar::handle:vertical:hover { background: #3A3A44; }
             QScrollBar::add-line:vertical, QScrollBar::sub-line:vertical { height: 14px; background: transparent; }
 
+            QTabWidget::pane { border: none; }
+            QTabBar::tab {
+                background: #232329; color: #A0A0AA; padding: 6px 14px; margin-right: 4px;
+                border: 1px solid #2E2E36; border-radius: 8px;
+            }
+            QTabBar::tab:selected { background: #2A2A30; color: #E6E6EB; border-color: #1976D2; }
+            QComboBox {
+                background-color: #232329; border: 1px solid #3A3A44; border-radius: 8px; padding: 4px 10px;
+            }
+
             QLabel.subtle { color: #A0A0AA; }
             QLabel.kpi { font-size: 18px; font-weight: 800; }
             QLabel.kpiTitle { color: #A0A0AA; }
@@ -626,6 +732,17 @@ class MainWindow(QMainWindow):
         self.btn_generate = QPushButton("Générer")
         self.btn_stop = QPushButton("Arrêter")
         self.btn_stop.setEnabled(False)
+        self.btn_nth = QPushButton("p_N seul")
+        self.btn_nth.setToolTip("Calculer directement le N-ième premier, sans générer les précédents")
+
+        lblr = QLabel("Ou intervalle [a, b] :")
+        self.edit_range = QLineEdit()
+        self.edit_range.setPlaceholderText("ex. 10^15 .. 10^15 + 10^10")
+        self.edit_range.setClearButtonEnabled(True)
+        self.edit_range.setToolTip("Tous les premiers de a à b (b < 2^64) ; le nombre ci-dessus est alors ignoré")
+        self.chk_pyramid = QCheckBox("Graphique")
+        self.chk_pyramid.setToolTip("Construire la pyramide d'agrégats de l'onglet « Graphique » pendant la "
+                                    "génération (surcoût d'environ 10 %)")
 
         quick = QHBoxLayout()
         quick.setSpacing(8)
@@ -642,7 +759,11 @@ class MainWindow(QMainWindow):
         params.addWidget(self.edit_count, 0, 1)
         params.addWidget(self.btn_generate, 0, 2)
         params.addWidget(self.btn_stop, 0, 3)
-        params.addLayout(quick, 1, 0, 1, 4)
+        params.addWidget(self.btn_nth, 0, 4)
+        params.addWidget(lblr, 1, 0)
+        params.addWidget(self.edit_range, 1, 1, 1, 2)
+        params.addWidget(self.chk_pyramid, 1, 3, 1, 2)
+        params.addLayout(quick, 2, 0, 1, 5)
 
         # Carte stats
         card_stats = Card()
@@ -655,7 +776,9 @@ class MainWindow(QMainWindow):
         self.lbl_max = QLabel("0")
         self.lbl_avg = QLabel("0")
         self.lbl_sum = QLabel("0")
-        for w in (self.lbl_count, self.lbl_max, self.lbl_avg, self.lbl_sum):
+        self.lbl_twins = QLabel("—")
+        self.lbl_record = QLabel("—")
+        for w in (self.lbl_count, self.lbl_max, self.lbl_avg, self.lbl_sum, self.lbl_twins, self.lbl_record):
             w.setProperty("class", "kpi")
             w.setStyleSheet("font-size:22px;font-weight:900;")
         stats.addWidget(QLabel("Nombres générés"), 0, 0)
@@ -666,6 +789,11 @@ class MainWindow(QMainWindow):
         stats.addWidget(self.lbl_avg, 1, 2)
         stats.addWidget(QLabel("Somme totale"), 0, 3)
         stats.addWidget(self.lbl_sum, 1, 3)
+        stats.addWidget(QLabel("Paires jumelles"), 2, 0)
+        stats.addWidget(self.lbl_twins, 3, 0)
+        stats.addWidget(QLabel("Écart record"), 2, 1, 1, 3)
+        stats.addWidget(self.lbl_record, 3, 1, 1, 3)
+        self.card_stats = card_stats
 
         row.addWidget(card_params, 2)
         row.addWidget(card_stats, 3)
@@ -690,23 +818,43 @@ class MainWindow(QMainWindow):
         tvlay.setContentsMargins(12, 12, 12, 12)
         self.table = QTableView()
         set_monospace(self.table)
-        tvlay.addWidget(self.table)
+        # Au-delà de la fenêtre du modèle, cette barre couvre tout le magasin
+        self.vscroll = QScrollBar(Qt.Vertical)
+        self.vscroll.setVisible(False)
+        table_row = QHBoxLayout()
+        table_row.setSpacing(0)
+        table_row.addWidget(self.table)
+        table_row.addWidget(self.vscroll)
+        table_page = QWidget()
+        table_page.setLayout(table_row)
+        table_row.setContentsMargins(0, 8, 0, 0)
+
+        # Graphique (pyramide d'agrégats du magasin)
+        chart_page = QWidget()
+        chart_lay = QVBoxLayout(chart_page)
+        chart_lay.setContentsMargins(0, 8, 0, 0)
+        self.combo_chart = QComboBox()
+        self.combo_chart.addItems(PyramidChart.MODES)
+        self.chart = PyramidChart()
+        chart_lay.addWidget(self.combo_chart, alignment=Qt.AlignLeft)
+        chart_lay.addWidget(self.chart, stretch=1)
+
+        self.tabs = QTabWidget()
+        self.tabs.addTab(table_page, "Tableau")
+        self.tabs.addTab(chart_page, "Graphique")
+        tvlay.addWidget(self.tabs)
         root.addWidget(card_table, stretch=1)
 
         # Navigation + export
         bottom = QHBoxLayout()
         bottom.setSpacing(10)
-        self.btn_prev = QPushButton("< Précédent")
-        self.btn_next = QPushButton("Suivant >")
         self.edit_goto = QLineEdit()
         self.edit_goto.setPlaceholderText("Index")
         self.edit_goto.setMaximumWidth(140)
         self.btn_goto = QPushButton("Aller")
-        self.lbl_pages = QLabel("Page 0/0")
+        self.lbl_pages = QLabel("Ligne 0/0")
         self.lbl_pages.setProperty("class", "subtle")
-        self.btn_export = QPushButton("Exporter en .txt")
-        bottom.addWidget(self.btn_prev)
-        bottom.addWidget(self.btn_next)
+        self.btn_export = QPushButton("Exporter…")
         bottom.addWidget(self.edit_goto)
         bottom.addWidget(self.btn_goto)
         bottom.addStretch(1)
@@ -745,17 +893,22 @@ class MainWindow(QMainWindow):
         tv.verticalHeader().setDefaultSectionSize(tv.fontMetrics().height() + 10)
 
     def _connect_signals(self):
-        # pagination
-        self.btn_prev.clicked.connect(self._prev)
-        self.btn_next.clicked.connect(self._next)
+        # navigation
+        self.vscroll.valueChanged.connect(self._on_proxy_scrolled)
+        self.table.verticalScrollBar().valueChanged.connect(self._on_table_scrolled)
         self.btn_goto.clicked.connect(self._goto_index)
         self.edit_goto.returnPressed.connect(self._goto_index)
 
         # génération
         self.btn_generate.clicked.connect(self.on_generate)
         self.btn_stop.clicked.connect(self.on_stop)
+        self.btn_nth.clicked.connect(self.on_nth_prime)
         self.btn_export.clicked.connect(self.on_export)
 
+        # graphique
+        self.combo_chart.currentIndexChanged.connect(self.chart.set_mode)
+        self.tabs.currentChanged.connect(lambda i: self._reload_chart() if i == 1 else None)
+
     # ------------------- Animations -------------------
     def _fade_in(self):
         self._fade = QPropertyAnimation(self, b"windowOpacity", self)
@@ -771,29 +924,78 @@ class MainWindow(QMainWindow):
         self.progress.setValue(val)
 
     # ------------------- Données & état -------------------
+    def _proxy_steps(self, total: int) -> int:
+        # Une position de la barre par ligne, ou par groupe de lignes au-delà de 2^31
+        return min(max(total - 1, 0), (1 << 31) - 1)
+
+    def _top_row(self) -> int:
+        return self.model.offset + max(0, self.table.rowAt(0))
+
     def _update_pages(self):
-        total = self.get_found()
-        ps = self.model.page_size
-        total_pages = (total + ps - 1) // ps if total > 0 else 0
-        current_page = (self.model.offset // ps) + 1 if total > 0 else 0
-        self.lbl_pages.setText(f"Page {current_page}/{total_pages}")
-        self.btn_prev.setEnabled(self.model.offset > 0)
-        self.btn_next.setEnabled(self.model.offset + ps < total)
-
-    def _prev(self):
-        self.model.prev_page()
+        total = self.model.total()
+        proxied = total > self.model.WINDOW_ROWS
+        self.table.setVerticalScrollBarPolicy(Qt.ScrollBarAlwaysOff if proxied else Qt.ScrollBarAlwaysOn)
+        self.vscroll.setVisible(proxied)
+        top = self._top_row() if total else -1
+        if proxied:
+            steps = self._proxy_steps(total)
+            self.vscroll.blockSignals(True)
+            self.vscroll.setRange(0, steps)
+            self.vscroll.setPageStep(max(1, steps * self.table.viewport().height()
+                                         // max(1, self.table.rowHeight(0) * total)))
+            self.vscroll.setValue(top * steps // max(1, total - 1))
+            self.vscroll.blockSignals(False)
+        self.lbl_pages.setText(f"Ligne {top + 1:,}/{total:,}".replace(",", " "))
+
+    def _show_row(self, row: int):
+        # Amène la ligne row (0-based, sur tout le magasin) en haut de la vue ; la fenêtre du
+        # modèle est recentrée quand la ligne en approche le bord
+        total = self.model.total()
+        if total <= 0:
+            return
+        row = max(0, min(int(row), total - 1))
+        self.model.set_offset(self.model.offset_for(row))
+        self._syncing = True
+        try:
+            self.table.scrollTo(self.model.index(row - self.model.offset, 0), QAbstractItemView.PositionAtTop)
+        finally:
+            self._syncing = False
         self._update_pages()
 
-    def _next(self):
-        self.model.next_page()
-        self._update_pages()
+    def _on_proxy_scrolled(self, value: int):
+        total = self.model.total()
+        self._show_row(value * max(0, total - 1) // max(1, self._proxy_steps(total)))
+
+    def _on_table_scrolled(self, _value: int):
+        # Défilement dans la vue (molette, clavier) : la fenêtre ne bouge qu'près de son bord
+        if self._syncing:
+            return
+        top = self._top_row()
+        if self.model.total() > self.model.WINDOW_ROWS and self.model.offset_for(top) != self.model.offset:
+            self._show_row(top)
+        else:
+            self._update_pages()
 
     def _goto_index(self):
         try:
-            idx = int(self.edit_goto.text())
-            self.model.goto_index(idx - 1)
+            idx = parse_int_expr(self.edit_goto.text())
         except Exception:
-            pass
+            return
+        self._show_row(idx - 1)
+        local = idx - 1 - self.model.offset
+        if 0 <= local < self.model.rowCount():
+            self.table.selectRow(local)
+
+    def _reload_chart(self):
+        # Pyramide relue en mémoire : le générateur peut la réécrire (points de reprise)
+        path = pyramid_path(self.mmap_path)
+        try:
+            pyramid = GapPyramid.open(path, in_memory=True) if path.exists() else None
+        except (OSError, ValueError, IndexError):
+            pyramid = None
+        meta = read_store_meta(self.mmap_path)
+        rng = meta["range"] if meta is not None else None
+        self.chart.set_pyramid(pyramid, rng[0] if rng is not None else None)
 
     def get_found(self) -> int:
         return self._found
@@ -810,14 +1012,39 @@ class MainWindow(QMainWindow):
         self.lbl_sum.setText(f"{self._sum:,}".replace(",", " "))
         self.lbl_avg.setText(f"{self._avg:,.2f}".replace(",", " "))
 
+    def set_prime_stats(self, stats):
+        """Statistiques calculées pendant le crible (PrimeStats.report()), None pour effacer."""
+        stats = stats or {}
+
+        def fmt(v):
+            return f"{v:,}".replace(",", " ")
+
+        self.lbl_twins.setText(fmt(stats["twins"]) if "twins" in stats else "—")
+        if stats.get("records"):
+            gap, p, row = stats["records"][-1]
+            self.lbl_record.setText(f"{gap} après {fmt(p)}")
+            self.lbl_record.setToolTip("Écarts maximaux (écart : premier, index)\n" + "\n".join(
+                f"{g} : {fmt(q)}, #{fmt(r + 1)}" for g, q, r in stats["records"]))
+        else:
+            self.lbl_record.setText("—")
+            self.lbl_record.setToolTip("")
+        tips = []
+        if stats.get("rows") and stats["rows"][0]:
+            tips.append(f"Statistiques à partir de l'index {fmt(stats['rows'][0] + 1)} (magasin prolongé)")
+        if stats.get("gaps"):
+            top = sorted(stats["gaps"].items(), key=lambda kv: -kv[1])[:8]
+            tips.append("Écarts les plus fréquents : " + ", ".join(f"{g} ({fmt(c)})" for g, c in top))
+        if "residues" in stats:
+            k, counts = stats["residues"]["modulus"], stats["residues"]["counts"]
+            tips.append(f"Résidus mod {k} : " + ", ".join(f"{r} ({fmt(c)})" for r, c in enumerate(counts) if c))
+        self.card_stats.setToolTip("\n".join(tips))
+
     # ------------------- Callbacks worker -------------------
     def on_progress(self, found: int, total: int):
-        old = self._found
+        # Les lignes du tableau arrivent juste avant par le signal rows (model.set_rows)
         self.set_found(found)
         self._target = total
-        if found > old:
-            self.model.reload_memmap(self.mmap_path)
-        pct = int((found / total) * 100) if total else 0
+        pct = min(100, int((found / total) * 100)) if total else 0
         self.progress.setValue(pct)
         self.lbl_status.setText(f"Génération… {found:,}/{total:,} ({pct}%)".replace(",", " "))
         self._update_pages()
@@ -825,87 +1052,198 @@ class MainWindow(QMainWindow):
     def on_status_update(self, msg: str):
         self.lbl_status.setText(msg)
 
-    def on_finished_ok(self, n, pmax, s, avg):
+    def show_profile(self, summary: str):
+        # Temps par phase du dernier run (génération ou export) en infobulle du statut
+        self.lbl_status.setToolTip(f"<pre>{summary}</pre>")
+
+    def on_finished_ok(self, n, pmax, s, avg, stats):
         self._ui_timer.stop()
-        old = self._found
         self.set_found(int(n))
-        if self._found > old:
-            try:
-                self.model.reload_memmap(self.mmap_path)
-            except Exception:
-                pass
+        try:
+            self.model.set_rows(self._found)   # magasin fermé : tout est lisible
+        except Exception:
+            pass
         self.set_stats(int(pmax), int(s), float(avg))
+        self.set_prime_stats(stats)
+        self._reload_chart()
         self.progress.setValue(100)
         self.lbl_status.setText("Terminé.")
         self.btn_generate.setEnabled(True)
         self.btn_stop.setEnabled(False)
+        self._thread.wait()  # le signal précède de peu la fin de run()
         self._thread = None
         self._update_pages()
+        self._start_tuning()
 
     def on_failed(self, msg: str):
         self._ui_timer.stop()
         QMessageBox.critical(self, "Erreur", f"Erreur lors de la génération :\n{msg}")
         self.btn_generate.setEnabled(True)
         self.btn_stop.setEnabled(False)
+        self._thread.wait()
         self._thread = None
+        self._start_tuning()
 
     # ------------------- Génération / Export -------------------
+    def _adopt_interrupted_store(self):
+        # Magasin le plus récent dont le point de reprise n'a pas atteint son objectif. Un magasin
+        # verrouillé (génération en cours) ou créé par une autre instance encore ouverte n'est
+        # pas interrompu : ses points de reprise le font seulement paraître inachevé.
+        candidates = []
+        for meta_path in self.cfg.tmp_dir.glob("primes_memmap_*.meta.json"):
+            path = meta_path.with_name(meta_path.name[:-len(".meta.json")])
+            owner = re.match(r"primes_memmap_(\d+)_", path.name)
+            if store_locked(path) or (owner and pid_alive(int(owner.group(1)))):
+                continue
+            meta = read_store_meta(path)
+            if meta is not None and path.exists() and store_meta_pending(meta):
+                candidates.append((meta_path.stat().st_mtime, path, meta))
+        if not candidates:
+            return
+        _, path, meta = max(candidates, key=lambda c: c[0])
+        self.cfg.mmap_filename = path.name
+        self.mmap_path = path
+        self.set_found(meta["count"])
+        self.set_stats(meta["pmax"], meta["sum"], meta["sum"] / max(1, meta["count"]))
+        self.model.reload_memmap(self.mmap_path, meta["count"])
+        self._update_pages()
+        self._reload_chart()
+        if meta["range"] is not None:
+            a, b = meta["range"]
+            self.edit_range.setText(f"{a} .. {b}")
+            self.progress.setValue(int(100 * (meta["current"] - a) / max(1, b - a + 1)))
+            self.lbl_status.setText(
+                f"Intervalle interrompu ({meta['count']:,} premiers, jusqu'à {meta['pmax']:,}) — "
+                f"« Générer » pour reprendre.".replace(",", " ")
+            )
+            return
+        self.edit_count.setText(str(meta["target"]))
+        self.progress.setValue(int(100 * meta["count"] / max(1, meta["target"])))
+        self.lbl_status.setText(
+            f"Génération interrompue ({meta['count']:,} / {meta['target']:,}) — "
+            f"« Générer » pour reprendre.".replace(",", " ")
+        )
+
+    @staticmethod
+    def _split_range(text: str):
+        """« a .. b » (ou « a ; b ») -> (a, b) avec 0 <= a <= b < 2^64 ; ValueError sinon."""
+        parts = re.split(r"\.\.|;", text)
+        if len(parts) != 2:
+            raise ValueError(text)
+        a, b = (parse_int_expr(p) for p in parts)
+        if not 0 <= a <= b < 1 << 64:
+            raise ValueError(text)
+        return a, b
+
+    def _parse_range(self):
+        """(a, b) saisi dans edit_range, None si vide ; ValueError si invalide."""
+        text = self.edit_range.text().strip()
+        return self._split_range(text) if text else None
+
+    def _ask_export_part(self):
+        """Sous-plage à exporter : (rows, values), (None, None) pour tout, None si annulé."""
+        while True:
+            text, ok = QInputDialog.getText(
+                self, "Plage à exporter",
+                "Vide : tout exporter\n"
+                "#500e6 .. 510e6 : par index (colonne « Index », bornes incluses)\n"
+                "10^9 .. 2e9 : par valeur (bornes incluses)"
+            )
+            if not ok:
+                return None
+            text = text.strip()
+            if not text:
+                return None, None
+            try:
+                a, b = self._split_range(text.lstrip("#"))
+            except ValueError:
+                QMessageBox.warning(self, "Entrée invalide", "Plage attendue : a .. b (ou #i .. j pour des index).")
+                continue
+            if text.startswith("#"):
+                return (max(a - 1, 0), b), None
+            return None, (a, b)
+
     def _quick(self, v: int):
         self.edit_count.setText(str(v))
+        self.edit_range.clear()
         self.on_generate()
 
     def on_generate(self):
         if self._thread is not None:
             return
 
-        # Fichier memmap unique par session
-        unique_name = f"primes_memmap_{os.getpid()}_{int(time.time() * 1000)}.dat"
-        self.cfg.mmap_filename = unique_name
-        self.mmap_path = self.cfg.tmp_dir / self.cfg.mmap_filename
-        self.model.reload_memmap(self.mmap_path)
-
         try:
-            total = int(self.edit_count.text().replace(" ", ""))
-            if total < 1:
-                raise ValueError
+            prime_range = self._parse_range()
         except ValueError:
-            QMessageBox.warning(self, "Entrée invalide", "Veuillez entrer un entier positif.")
+            QMessageBox.warning(self, "Entrée invalide", "Intervalle attendu : a .. b, avec 0 <= a <= b < 2^64.")
             return
+        if prime_range is not None:
+            # Taille du travail : nombre de premiers attendu dans [a, b]
+            a, b = prime_range
+            total = max(1, int(riemann_r(b) - riemann_r(max(a - 1, 0))))
+        else:
+            try:
+                total = int(self.edit_count.text().replace(" ", ""))
+                if total < 1:
+                    raise ValueError
+            except ValueError:
+                QMessageBox.warning(self, "Entrée invalide", "Veuillez entrer un entier positif.")
+                return
 
         self._target = total
-        self.set_found(0)
-        self.set_stats(0, 0, 0.0)
         self.progress.setValue(0)
         self.lbl_status.setText("Initialisation…")
         self.btn_generate.setEnabled(False)
         self.btn_stop.setEnabled(True)
-
-        if total >= 1_000_000_000:
-            segment_size = 1 << 23
-            update_interval = 125
-        elif total >= 100_000_000:
-            segment_size = 1 << 22
-            update_interval = 90
-        elif total >= 10_000_000:
-            segment_size = 1 << 21
-            update_interval = 60
+        self.set_prime_stats(None)
+
+        # Un calibrage concurrent fausserait ses mesures et prendrait du CPU au crible : il est
+        # abandonné et reprendra à la fin de la génération
+        self._stop_tuning()
+        settings = tuned_settings(total)
+
+        # Magasin compatible déjà présent et plus court (ou même intervalle inachevé) : on le
+        # prolonge (seul le delta est criblé) ; sinon nouveau fichier memmap unique par session
+        meta = read_store_meta(self.mmap_path) if self.mmap_path.exists() else None
+        if meta is None:
+            extend = False
+        elif prime_range is not None:
+            extend = meta["range"] == prime_range and store_meta_pending(meta)
         else:
-            segment_size = 1 << 20
-            update_interval = 40
+            extend = meta["range"] is None and meta["count"] < total
+        if extend:
+            settings["store_format"] = meta["format"]
+            self.set_found(meta["count"])
+            self.set_stats(meta["pmax"], meta["sum"], meta["sum"] / max(1, meta["count"]))
+            self.model.release()
+        else:
+            self.set_found(0)
+            self.set_stats(0, 0, 0.0)
+            suffix = STORE_FORMATS[settings["store_format"]][0]
+            unique_name = f"primes_memmap_{os.getpid()}_{int(time.time() * 1000)}{suffix}"
+            self.cfg.mmap_filename = unique_name
+            self.mmap_path = self.cfg.tmp_dir / self.cfg.mmap_filename
+            self.model.reload_memmap(self.mmap_path, 0)
+        self._reload_chart()
 
         cfg = GenConfig(
             count=total,
-            segment_size=segment_size,
-            update_interval_ms=update_interval,
+            extend=extend,
+            prime_range=prime_range,
             tmp_dir=self.cfg.tmp_dir,
-            mmap_filename=self.cfg.mmap_filename
+            mmap_filename=self.cfg.mmap_filename,
+            trace_file=trace_path(self.cfg.mmap_filename),
+            stats=self.cfg.stats + (("pyramid",) if self.chk_pyramid.isChecked() else ()),
+            **settings
         )
 
         self._thread = PrimeGenThread(cfg)
+        self._thread.rows.connect(self.model.set_rows)
         self._thread.progress.connect(self.on_progress)
         self._thread.finished_ok.connect(self.on_finished_ok)
         self._thread.failed.connect(self.on_failed)
         self._thread.status_update.connect(self.on_status_update)
+        self._thread.profiled.connect(self.show_profile)
         self._thread.start()
 
         self._ui_timer.start(33)
@@ -916,26 +1254,61 @@ class MainWindow(QMainWindow):
             self.btn_stop.setEnabled(False)
             self.lbl_status.setText("Arrêt en cours…")
 
+    def on_nth_prime(self):
+        try:
+            n = int(self.edit_count.text().replace(" ", ""))
+            if n < 1:
+                raise ValueError
+        except ValueError:
+            QMessageBox.warning(self, "Entrée invalide", "Veuillez entrer un entier positif.")
+            return
+        self.btn_nth.setEnabled(False)
+        self.lbl_status.setText(f"Calcul direct de p_{n:,}…".replace(",", " "))
+        self.nth_thread = NthPrimeThread(n)
+        self.nth_thread.finished_ok.connect(self.on_nth_finished)
+        self.nth_thread.failed.connect(self.on_nth_failed)
+        self.nth_thread.start()
+
+    def on_nth_finished(self, n, window):
+        self.nth_thread.wait()
+        self.btn_nth.setEnabled(True)
+        text = f"p_{n:,} = {int(window[0]):,}".replace(",", " ")
+        self.lbl_status.setText(text)
+        QMessageBox.information(self, "N-ième premier", text)
+
+    def on_nth_failed(self, msg: str):
+        self.nth_thread.wait()
+        self.btn_nth.setEnabled(True)
+        QMessageBox.critical(self, "Erreur", f"Erreur lors du calcul de p_N :\n{msg}")
+
     def on_export(self):
         if self._found <= 0 or not self.mmap_path.exists():
             QMessageBox.information(self, "Information", "Aucune donnée à exporter.")
             return
 
-        filename, _ = QFileDialog.getSaveFileName(
+        # Un filtre par format d'export ; le filtre choisi fixe le format et l'extension
+        filters = {f"{label} (*{ext})": fmt for fmt, (ext, label) in EXPORT_FORMATS.items()}
+        filename, chosen = QFileDialog.getSaveFileName(
             self,
-            "Exporter en .txt",
+            "Exporter",
             "primes",
-            "Fichiers texte (*.txt);;Tous les fichiers (*)"
+            ";;".join(filters)
         )
         if not filename:
             return
-        txt_file = filename if filename.endswith(".txt") else filename + ".txt"
+        fmt = filters.get(chosen, "txt")
+        ext = EXPORT_FORMATS[fmt][0]
+        out_file = filename if filename.endswith(ext) else filename + ext
+        part = self._ask_export_part()
+        if part is None:
+            return
 
         self.export_dialog = ExportDialog(self)
-        self.export_thread = ExportThread(self.mmap_path, self._found, txt_file)
+        self.export_thread = ExportThread(self.mmap_path, self._found, out_file, fmt, *part)
         self.export_thread.progress.connect(self.export_dialog.set_progress)
         self.export_thread.finished_ok.connect(self.on_export_finished)
         self.export_thread.failed.connect(self.on_export_failed)
+        self.export_thread.profiled.connect(self.show_profile)
         self.export_dialog.btn_stop.clicked.connect(self.export_thread.stop)
         self.export_thread.start()
         self.export_dialog.show()
@@ -948,11 +1321,41 @@ class MainWindow(QMainWindow):
         self.export_dialog.close()
         QMessageBox.critical(self, "Erreur", f"Erreur lors de l'export :\n{msg}")
 
+    def _start_tuning(self):
+        # Seulement hors génération, et tant que cet hôte n'a pas de réglage enregistré
+        if self._thread is not None or self._tune_thread is not None or load_tuning() is not None:
+            return
+        self._tune_thread = TuneThread(self)
+        self._tune_thread.finished.connect(self._on_tune_done)
+        self._tune_thread.finished_ok.connect(self.on_tuned)
+        self._tune_thread.failed.connect(self.on_status_update)
+        self._tune_thread.start()
+
+    def _stop_tuning(self, timeout_ms: int = 3000):
+        # Le calibrage consulte stop() à chaque segment : l'attente est brève
+        if self._tune_thread is not None:
+            self._tune_thread.stop()
+            self._tune_thread.wait(timeout_ms)
+            self._tune_thread = None
+
+    def _on_tune_done(self):
+        if self._tune_thread is not None and not self._tune_thread.isRunning():
+            self._tune_thread = None
+
+    def on_tuned(self, tuning: dict):
+        if self._thread is None:
+            self.lbl_status.setText(
+                f"Crible calibré pour cette machine : segments de {tuning['segment_size'] >> 10:,} Kio."
+                .replace(",", " "))
+
     # ------------------- Cycle de vie -------------------
     def closeEvent(self, event):
         if self._thread is not None:
+            # Le thread écrit son dernier point de reprise en s'arrêtant ; s'il n'a pas fini
+            # à temps, la reprise repartira du point périodique précédent
             self._thread.stop()
-            self._thread.wait(1000)
+            self._thread.wait(15000)
+        self._stop_tuning()
         event.accept()
 
 
@@ -965,4 +1368,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()
     sys.exit(main())